@@ -6,6 +6,7 @@ test_only = False  # test process
 seed = None  # train process will init a random seed and record
 save_path = "exp/default"
 num_worker = 16  # total worker in all gpu
+num_worker_test = None  # test worker per gpu, None for num_worker // num_gpu
 batch_size = 16  # total batch size in all gpu
 batch_size_val = None  # auto adapt to bs 1 for each gpu
 batch_size_test = None  # auto adapt to bs 1 for each gpu
@@ -16,9 +17,28 @@ sync_bn = False
 enable_amp = False
 empty_cache = False
 empty_cache_per_epoch = False
+# test fragments per forward pass by total points, None for one fragment per pass
+fragment_point_budget = None
+# scenes accumulating test predictions on the GPU, further open scenes (up to one
+# per loader worker) accumulate on the CPU
+test_cuda_scenes = 2
+# test prediction writer: background threads, float16 top-k probabilities per point
+# ({name}_topk.npz, 0 to disable), folder of source LAS/LAZ tiles to export into
+writer_threads = 4
+pred_topk = 0
+las_root = None
 find_unused_parameters = False
 
 mix_prob = 0
+# batch train data by point budget instead of batch_size, example:
+# train_sampler = dict(
+#     type="PointBudgetBatchSampler", point_budget=1000000, point_ratio="auto"
+# )
+train_sampler = None
+# collate train batches into a ring of shared memory slabs (/dev/shm), slabs are
+# sized from the max points per batch (point budget of train_sampler by default)
+# shm_transport = dict(point_budget=1000000, headroom=1.5, num_slabs=None)
+shm_transport = None
 param_dicts = None  # example: param_dicts = [dict(keyword="block", lr_scale=0.1)]
 
 # hook
@@ -27,11 +47,12 @@ hooks = [
     dict(type="IterationTimer", warmup_iter=2),
     dict(type="InformationWriter"),
     dict(type="SemSegEvaluator"),
-    dict(type="CheckpointSaver", save_freq=None),
+    dict(type="CheckpointSaver", save_freq=None),  # async_save=True, max_keep=N
     dict(type="PreciseEvaluator", test_last=False),
 ]
 
 # Trainer
+# IterationTrainer with CheckpointSaver(save_iter_freq=N) resumes mid-epoch
 train = dict(type="DefaultTrainer")
 
 # Tester
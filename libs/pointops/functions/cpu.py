@@ -0,0 +1,185 @@
+"""
+CPU backends of the pointops kernels, used for tensors on CPU.
+
+Samples are split by offset as in the CUDA kernels. Neighbor queries run on a
+KD-tree per sample (scipy cKDTree, queries on all cores), farthest point
+sampling runs samples in parallel on a thread pool, grouping and interpolation
+use torch indexing. Missing neighbors are -1 with squared distance 1e10, as in
+the CUDA kernels.
+"""
+
+import os
+import numpy as np
+import torch
+from concurrent.futures import ThreadPoolExecutor
+from scipy.spatial import cKDTree
+
+# candidate neighbors held per query chunk of a ball query
+MAX_CANDIDATES = 2**22
+
+
+def _ranges(offset):
+    end = offset.tolist()
+    return list(zip([0] + end[:-1], end))
+
+
+def _numpy(xyz):
+    return np.ascontiguousarray(xyz.detach().float().numpy())
+
+
+def knn_query_cpu(nsample, xyz, offset, new_xyz, new_offset):
+    """
+    input: xyz: (n, 3), offset: (b), new_xyz: (m, 3), new_offset: (b)
+    output: idx: (m, nsample) sorted by distance, dist2: (m, nsample)
+    """
+    xyz, new_xyz = _numpy(xyz), _numpy(new_xyz)
+    m = new_xyz.shape[0]
+    idx = np.full((m, nsample), -1, dtype=np.int32)
+    dist2 = np.full((m, nsample), 1e10, dtype=np.float32)
+    for (start, end), (new_start, new_end) in zip(_ranges(offset), _ranges(new_offset)):
+        k = min(nsample, end - start)
+        if k == 0 or new_end == new_start:
+            continue
+        dist, index = cKDTree(xyz[start:end]).query(
+            new_xyz[new_start:new_end], k=k, workers=-1
+        )
+        idx[new_start:new_end, :k] = index.reshape(-1, k) + start
+        dist2[new_start:new_end, :k] = dist.reshape(-1, k) ** 2
+    return torch.from_numpy(idx), torch.from_numpy(dist2)
+
+
+def _ball_candidates(tree, queries, max_radius, min_radius):
+    """
+    Yield (chunk slice, candidate index, candidate dist2, number of candidates)
+    with the candidates of each query (d2 <= 1e-5 or min_radius^2 <= d2 <
+    max_radius^2) first in the rows, sorted by distance.
+    """
+    count = tree.query_ball_point(queries, r=max_radius, return_length=True, workers=-1)
+    # queries per chunk bounded by the largest candidate count
+    step = max(MAX_CANDIDATES // max(int(count.max()), 1), 1)
+    for begin in range(0, queries.shape[0], step):
+        chunk = slice(begin, min(begin + step, queries.shape[0]))
+        k = max(int(count[chunk].max()), 1)
+        dist, index = tree.query(
+            queries[chunk], k=k, distance_upper_bound=max_radius, workers=-1
+        )
+        dist2 = dist.reshape(-1, k).astype(np.float32) ** 2
+        index = index.reshape(-1, k)
+        valid = (dist2 <= 1e-5) | ((dist2 >= min_radius**2) & (dist2 < max_radius**2))
+        order = np.argsort(~valid, axis=1, kind="stable")
+        yield (
+            chunk,
+            np.take_along_axis(index, order, axis=1),
+            np.take_along_axis(dist2, order, axis=1),
+            valid.sum(1),
+        )
+
+
+def ball_query_cpu(
+    nsample, max_radius, min_radius, xyz, offset, new_xyz, new_offset, randomize=False
+):
+    """
+    input: xyz: (n, 3), offset: (b), new_xyz: (m, 3), new_offset: (b)
+    output: idx: (m, nsample), dist2: (m, nsample)
+
+    Up to nsample candidates sorted by distance, evenly strided over the sorted
+    candidates if there are more, or nsample random candidates if randomize
+    (random_ball_query).
+    """
+    xyz, new_xyz = _numpy(xyz), _numpy(new_xyz)
+    m = new_xyz.shape[0]
+    idx = np.full((m, nsample), -1, dtype=np.int32)
+    dist2 = np.full((m, nsample), 1e10, dtype=np.float32)
+    slot = np.arange(nsample)
+    for (start, end), (new_start, new_end) in zip(_ranges(offset), _ranges(new_offset)):
+        if end == start or new_end == new_start:
+            continue
+        tree = cKDTree(xyz[start:end])
+        queries = new_xyz[new_start:new_end]
+        for chunk, index, dist, count in _ball_candidates(
+            tree, queries, max_radius, min_radius
+        ):
+            if randomize:
+                # random order of the candidates, as the shuffled scan in CUDA
+                key = torch.rand(index.shape).numpy()
+                key[np.arange(index.shape[1]) >= count[:, None]] = np.inf
+                order = np.argsort(key, axis=1)
+                index = np.take_along_axis(index, order, axis=1)
+                dist = np.take_along_axis(dist, order, axis=1)
+                pick = np.broadcast_to(slot, (index.shape[0], nsample))
+            else:
+                sep = count.astype(np.float32) / nsample
+                pick = np.where(
+                    (count > nsample)[:, None],
+                    (sep[:, None] * slot).astype(np.int64),
+                    slot,
+                )
+            pick = np.minimum(pick, index.shape[1] - 1)
+            valid = slot < count[:, None]
+            rows = slice(new_start + chunk.start, new_start + chunk.start + len(count))
+            idx[rows] = np.where(
+                valid, np.take_along_axis(index, pick, axis=1) + start, -1
+            )
+            dist2[rows] = np.where(valid, np.take_along_axis(dist, pick, axis=1), 1e10)
+    return torch.from_numpy(idx), torch.from_numpy(dist2)
+
+
+def farthest_point_sampling_cpu(xyz, offset, new_offset):
+    """
+    input: xyz: (n, 3), offset: (b), new_offset: (b)
+    output: idx: (m), starting from the first point of every sample
+    """
+    xyz = _numpy(xyz)
+    idx = np.zeros(int(new_offset[-1]) if len(new_offset) else 0, dtype=np.int32)
+    ranges = list(zip(_ranges(offset), _ranges(new_offset)))
+    if len(ranges) == 0:
+        return torch.from_numpy(idx)
+
+    def sample(ranges):
+        (start, end), (new_start, new_end) = ranges
+        if end == start or new_end == new_start:
+            return
+        x, y, z = (np.ascontiguousarray(xyz[start:end, i]) for i in range(3))
+        dist = np.full(end - start, 1e10, dtype=np.float32)
+        buffer = np.empty_like(dist)
+        last = 0
+        for j in range(new_start, new_end):
+            idx[j] = start + last
+            np.subtract(x, x[last], out=buffer)
+            d = buffer * buffer
+            np.subtract(y, y[last], out=buffer)
+            d += buffer * buffer
+            np.subtract(z, z[last], out=buffer)
+            d += buffer * buffer
+            np.minimum(dist, d, out=dist)
+            last = int(dist.argmax())
+
+    with ThreadPoolExecutor(max_workers=min(len(ranges), os.cpu_count())) as pool:
+        list(pool.map(sample, ranges))
+    return torch.from_numpy(idx)
+
+
+def grouping_forward_cpu(input, idx):
+    return input[idx.long()]
+
+
+def grouping_backward_cpu(grad_output, idx, n):
+    c = grad_output.shape[-1]
+    grad_input = grad_output.new_zeros(n, c)
+    grad_input.index_add_(0, idx.reshape(-1).long(), grad_output.reshape(-1, c))
+    return grad_input
+
+
+def interpolation_forward_cpu(input, idx, weight):
+    return (input[idx.long()] * weight.unsqueeze(-1)).sum(1)
+
+
+def interpolation_backward_cpu(grad_output, idx, weight, m):
+    c = grad_output.shape[-1]
+    grad_input = grad_output.new_zeros(m, c)
+    grad_input.index_add_(
+        0,
+        idx.reshape(-1).long(),
+        (grad_output.unsqueeze(1) * weight.unsqueeze(-1)).reshape(-1, c),
+    )
+    return grad_input
@@ -1,7 +1,12 @@
 import torch
 from torch.autograd import Function
 
-from pointops._C import grouping_forward_cuda, grouping_backward_cuda
+try:
+    from pointops._C import grouping_forward_cuda, grouping_backward_cuda
+except ImportError:
+    grouping_forward_cuda = grouping_backward_cuda = None
+
+from .cpu import grouping_forward_cpu, grouping_backward_cpu
 
 
 class Grouping(Function):
@@ -13,8 +18,11 @@ class Grouping(Function):
         """
         assert input.is_contiguous() and idx.is_contiguous()
         m, nsample, n, c = idx.shape[0], idx.shape[1], input.shape[0], input.shape[1]
-        output = torch.cuda.FloatTensor(m, nsample, c)
-        grouping_forward_cuda(m, nsample, c, input, idx, output)
+        if input.is_cuda:
+            output = torch.cuda.FloatTensor(m, nsample, c)
+            grouping_forward_cuda(m, nsample, c, input, idx, output)
+        else:
+            output = grouping_forward_cpu(input, idx)
         ctx.n = n
         ctx.save_for_backward(idx)
         return output
@@ -28,6 +36,8 @@ class Grouping(Function):
         n = ctx.n
         (idx,) = ctx.saved_tensors
         m, nsample, c = grad_output.shape
+        if not grad_output.is_cuda:
+            return grouping_backward_cpu(grad_output, idx, n), None
         grad_input = torch.cuda.FloatTensor(n, c).zero_()
         grouping_backward_cuda(m, nsample, c, grad_output, idx, grad_input)
         return grad_input, None
@@ -1,7 +1,12 @@
 import torch
 from torch.autograd import Function
 
-from pointops._C import interpolation_forward_cuda, interpolation_backward_cuda
+try:
+    from pointops._C import interpolation_forward_cuda, interpolation_backward_cuda
+except ImportError:
+    interpolation_forward_cuda = interpolation_backward_cuda = None
+
+from .cpu import interpolation_forward_cpu, interpolation_backward_cpu
 from .query import knn_query
 
 
@@ -16,7 +21,7 @@ def interpolation(xyz, new_xyz, feat, offset, new_offset, k=3):
     norm = torch.sum(dist_recip, dim=1, keepdim=True)
     weight = dist_recip / norm  # (n, 3)
 
-    new_feat = torch.cuda.FloatTensor(new_xyz.shape[0], feat.shape[1]).zero_()
+    new_feat = feat.new_zeros(new_xyz.shape[0], feat.shape[1])
     for i in range(k):
         new_feat += feat[idx[:, i].long(), :] * weight[:, i].unsqueeze(-1)
     return new_feat
@@ -36,8 +41,11 @@ class Interpolation(Function):
         weight = dist_recip / norm  # (n, k)
 
         n, c, m = new_xyz.shape[0], input.shape[1], input.shape[0]
-        output = torch.cuda.FloatTensor(n, c).zero_()
-        interpolation_forward_cuda(n, c, k, input, idx, weight, output)
+        if input.is_cuda:
+            output = torch.cuda.FloatTensor(n, c).zero_()
+            interpolation_forward_cuda(n, c, k, input, idx, weight, output)
+        else:
+            output = interpolation_forward_cpu(input, idx, weight)
         ctx.m, ctx.k = m, k
         ctx.save_for_backward(idx, weight)
         return output
@@ -51,6 +59,9 @@ class Interpolation(Function):
         m, k = ctx.m, ctx.k
         idx, weight = ctx.saved_tensors
         n, c = grad_output.shape
+        if not grad_output.is_cuda:
+            grad_input = interpolation_backward_cpu(grad_output, idx, weight, m)
+            return None, None, grad_input, None, None, None
         grad_input = torch.cuda.FloatTensor(m, c).zero_()
         interpolation_backward_cuda(n, c, k, grad_output, idx, weight, grad_input)
         return None, None, grad_input, None, None, None
@@ -1,7 +1,12 @@
 import torch
 from torch.autograd import Function
 
-from pointops._C import knn_query_cuda, random_ball_query_cuda, ball_query_cuda
+try:
+    from pointops._C import knn_query_cuda, random_ball_query_cuda, ball_query_cuda
+except ImportError:
+    knn_query_cuda = random_ball_query_cuda = ball_query_cuda = None
+
+from .cpu import knn_query_cpu, ball_query_cpu
 
 
 class KNNQuery(Function):
@@ -15,6 +20,9 @@ class KNNQuery(Function):
             new_xyz = xyz
             new_offset = offset
         assert xyz.is_contiguous() and new_xyz.is_contiguous()
+        if not xyz.is_cuda:
+            idx, dist2 = knn_query_cpu(nsample, xyz, offset, new_xyz, new_offset)
+            return idx, torch.sqrt(dist2)
         m = new_xyz.shape[0]
         idx = torch.cuda.IntTensor(m, nsample).zero_()
         dist2 = torch.cuda.FloatTensor(m, nsample).zero_()
@@ -43,6 +51,18 @@ class RandomBallQuery(Function):
             new_offset = offset
         assert xyz.is_contiguous() and new_xyz.is_contiguous()
         assert min_radius < max_radius
+        if not xyz.is_cuda:
+            idx, dist2 = ball_query_cpu(
+                nsample,
+                max_radius,
+                min_radius,
+                xyz,
+                offset,
+                new_xyz,
+                new_offset,
+                randomize=True,
+            )
+            return idx, torch.sqrt(dist2)
 
         m = new_xyz.shape[0]
         order = []
@@ -89,6 +109,11 @@ class BallQuery(Function):
             new_offset = offset
         assert xyz.is_contiguous() and new_xyz.is_contiguous()
         assert min_radius < max_radius
+        if not xyz.is_cuda:
+            idx, dist2 = ball_query_cpu(
+                nsample, max_radius, min_radius, xyz, offset, new_xyz, new_offset
+            )
+            return idx, torch.sqrt(dist2)
 
         m = new_xyz.shape[0]
         idx = torch.cuda.IntTensor(m, nsample).zero_()
@@ -1,7 +1,12 @@
 import torch
 from torch.autograd import Function
 
-from pointops._C import farthest_point_sampling_cuda
+try:
+    from pointops._C import farthest_point_sampling_cuda
+except ImportError:
+    farthest_point_sampling_cuda = None
+
+from .cpu import farthest_point_sampling_cpu
 
 
 class FarthestPointSampling(Function):
@@ -12,6 +17,8 @@ class FarthestPointSampling(Function):
         output: idx: (m)
         """
         assert xyz.is_contiguous()
+        if not xyz.is_cuda:
+            return farthest_point_sampling_cpu(xyz, offset, new_offset)
         n, b, n_max = xyz.shape[0], offset.shape[0], offset[0]
         for i in range(1, b):
             n_max = max(offset[i] - offset[i - 1], n_max)
@@ -1,7 +1,10 @@
 import torch
 from torch.autograd import Function
 
-from pointops._C import subtraction_forward_cuda, subtraction_backward_cuda
+try:
+    from pointops._C import subtraction_forward_cuda, subtraction_backward_cuda
+except ImportError:
+    subtraction_forward_cuda = subtraction_backward_cuda = None
 
 
 class Subtraction(Function):
@@ -1,6 +1,6 @@
 import os
 from setuptools import setup
-from torch.utils.cpp_extension import BuildExtension, CUDAExtension
+from torch.utils.cpp_extension import BuildExtension, CUDAExtension, CUDA_HOME
 from distutils.sysconfig import get_config_vars
 
 (opt,) = get_config_vars("OPT")
@@ -19,15 +19,20 @@ sources = [
 setup(
     name="pointops",
     version="1.0",
-    install_requires=["torch", "numpy"],
+    install_requires=["torch", "numpy", "scipy"],
     packages=["pointops"],
     package_dir={"pointops": "functions"},
-    ext_modules=[
-        CUDAExtension(
-            name="pointops._C",
-            sources=sources,
-            extra_compile_args={"cxx": ["-g"], "nvcc": ["-O2"]},
-        )
-    ],
+    # without CUDA only the CPU backends (functions/cpu.py) are available
+    ext_modules=(
+        [
+            CUDAExtension(
+                name="pointops._C",
+                sources=sources,
+                extra_compile_args={"cxx": ["-g"], "nvcc": ["-O2"]},
+            )
+        ]
+        if CUDA_HOME is not None
+        else []
+    ),
     cmdclass={"build_ext": BuildExtension},
 )
@@ -1,6 +1,12 @@
 from .defaults import DefaultDataset, ConcatDataset
-from .builder import build_dataset
+from .builder import build_dataset, build_sampler
 from .utils import point_collate_fn, collate_fn
+from .sampler import (
+    PointBudgetBatchSampler,
+    ResumableBatchSampler,
+    SeededDataset,
+    SizeBalancedSampler,
+)
 
 # indoor scene
 from .s3dis import S3DISDataset
@@ -21,3 +27,6 @@ from .shapenet_part import ShapeNetPartDataset
 
 # dataloader
 from .dataloader import MultiDatasetDataloader
+from .transport import build_slab_loader
+from .prefetcher import CUDAPrefetcher, to_cuda
+from .stream import FragmentStream
@@ -8,8 +8,14 @@ Please cite our work if the code is helpful to you.
 from pointcept.utils.registry import Registry
 
 DATASETS = Registry("datasets")
+SAMPLERS = Registry("samplers")
 
 
 def build_dataset(cfg):
     """Build datasets."""
     return DATASETS.build(cfg)
+
+
+def build_sampler(cfg, **kwargs):
+    """Build (batch) samplers."""
+    return SAMPLERS.build(cfg, default_args=kwargs)
@@ -14,7 +14,9 @@ from torch.utils.data import Dataset
 from collections.abc import Sequence
 
 from pointcept.utils.logger import get_root_logger
-from pointcept.utils.cache import shared_dict
+from pointcept.utils.cache import SharedSceneCache
+from pointcept.utils.packed import PackedSceneStore, get_pack_path
+from pointcept.utils.manifest import SceneManifest, read_npy_header
 
 from .builder import DATASETS, build_dataset
 from .transform import Compose, TRANSFORMS
@@ -31,23 +33,44 @@ class DefaultDataset(Dataset):
         "instance",
         "pose",
     ]
+    # glob pattern of scene folders under data_root/split
+    SCENE_PATTERN = "*"
 
     def __init__(
         self,
         split="train",
         data_root="data/dataset",
         transform=None,
+        fuse_transform=False,
         test_mode=False,
         test_cfg=None,
         cache=False,
+        cache_budget=None,
+        packed=False,
+        mmap_mode=None,
+        manifest=False,
         ignore_index=-1,
         loop=1,
     ):
         super(DefaultDataset, self).__init__()
         self.data_root = data_root
         self.split = split
-        self.transform = Compose(transform)
-        self.cache = cache
+        # fuse_transform: apply consecutive affine augmentations as one matrix
+        self.transform = Compose(transform, fuse=fuse_transform)
+        # node-local shared memory cache of raw assets, bounded by cache_budget bytes
+        self.cache = (
+            SharedSceneCache(
+                prefix=f"pointcept-{self.__class__.__name__}-", budget=cache_budget
+            )
+            if cache
+            else None
+        )
+        self.packed = packed
+        # "c": memory-map assets copy-on-write, pages are only read when touched
+        assert mmap_mode in [None, "r", "c"]
+        self.mmap_mode = mmap_mode
+        self.packed_store = self.get_packed_store() if packed else None
+        self.scene_manifest = self.get_scene_manifest() if manifest else None
         self.ignore_index = ignore_index
         self.loop = (
             loop if not test_mode else 1
@@ -71,8 +94,32 @@ class DefaultDataset(Dataset):
             )
         )
 
+    def get_packed_store(self):
+        splits = [self.split] if isinstance(self.split, str) else self.split
+        return {
+            split: PackedSceneStore(get_pack_path(self.data_root, split))
+            for split in splits
+        }
+
+    def get_scene_manifest(self):
+        splits = [self.split] if isinstance(self.split, str) else self.split
+        return {
+            split: SceneManifest(self.data_root, split, self.SCENE_PATTERN)
+            for split in splits
+        }
+
     def get_data_list(self):
-        if isinstance(self.split, str):
+        if self.packed:
+            data_list = []
+            for store in self.packed_store.values():
+                data_list += [os.path.join(self.data_root, key) for key in store.keys()]
+        elif self.scene_manifest is not None:
+            data_list = []
+            for manifest in self.scene_manifest.values():
+                data_list += [
+                    os.path.join(self.data_root, key) for key in manifest.keys()
+                ]
+        elif isinstance(self.split, str):
             data_list = glob.glob(os.path.join(self.data_root, self.split, "*"))
         elif isinstance(self.split, Sequence):
             data_list = []
@@ -85,44 +132,105 @@ class DefaultDataset(Dataset):
     def get_data(self, idx):
         data_path = self.data_list[idx % len(self.data_list)]
         name = self.get_data_name(idx)
-        if self.cache:
-            cache_name = f"pointcept-{name}"
-            return shared_dict(cache_name)
-
-        data_dict = {}
-        assets = os.listdir(data_path)
-        for asset in assets:
-            if not asset.endswith(".npy"):
-                continue
-            if asset[:-4] not in self.VALID_ASSETS:
-                continue
-            data_dict[asset[:-4]] = np.load(os.path.join(data_path, asset))
+        data_dict = self.load_assets(data_path)
         data_dict["name"] = name
 
         if "coord" in data_dict.keys():
-            data_dict["coord"] = data_dict["coord"].astype(np.float32)
+            data_dict["coord"] = self.cast(data_dict["coord"], np.float32)
 
         if "color" in data_dict.keys():
-            data_dict["color"] = data_dict["color"].astype(np.float32)
+            data_dict["color"] = self.cast(data_dict["color"], np.float32)
 
         if "normal" in data_dict.keys():
-            data_dict["normal"] = data_dict["normal"].astype(np.float32)
+            data_dict["normal"] = self.cast(data_dict["normal"], np.float32)
 
         if "segment" in data_dict.keys():
-            data_dict["segment"] = data_dict["segment"].reshape([-1]).astype(np.int32)
+            data_dict["segment"] = self.cast(
+                data_dict["segment"].reshape([-1]), np.int32
+            )
         else:
             data_dict["segment"] = (
                 np.ones(data_dict["coord"].shape[0], dtype=np.int32) * -1
             )
 
         if "instance" in data_dict.keys():
-            data_dict["instance"] = data_dict["instance"].reshape([-1]).astype(np.int32)
+            data_dict["instance"] = self.cast(
+                data_dict["instance"].reshape([-1]), np.int32
+            )
         else:
             data_dict["instance"] = (
                 np.ones(data_dict["coord"].shape[0], dtype=np.int32) * -1
             )
         return data_dict
 
+    def get_cache_name(self, data_path):
+        # e.g. data/scannet/train/scene0000_00 -> scannet-train-scene0000_00
+        data_name = os.path.relpath(
+            data_path, os.path.dirname(os.path.normpath(self.data_root))
+        )
+        return data_name.replace(os.path.sep, "-")
+
+    def load_assets(self, data_path):
+        if self.cache is None:
+            return self.read_assets(data_path)
+        cache_name = self.get_cache_name(data_path)
+        data_dict = self.cache.get(cache_name)
+        if data_dict is None:
+            data_dict = self.read_assets(data_path)
+            self.cache.put(cache_name, data_dict)
+        return data_dict
+
+    def read_assets(self, data_path):
+        if self.packed:
+            # packed scenes are keyed by their path relative to data_root
+            key = os.path.relpath(data_path, self.data_root)
+            split = key.split(os.path.sep)[0]
+            return self.packed_store[split].get(key, assets=self.VALID_ASSETS)
+
+        data_dict = {}
+        assets = self.list_assets(data_path)
+        for asset in assets:
+            if not asset.endswith(".npy"):
+                continue
+            if asset[:-4] not in self.VALID_ASSETS:
+                continue
+            data_dict[asset[:-4]] = np.load(
+                os.path.join(data_path, asset), mmap_mode=self.mmap_mode
+            )
+        return data_dict
+
+    def list_assets(self, data_path):
+        if self.scene_manifest is not None:
+            key = os.path.relpath(data_path, self.data_root)
+            split = key.split(os.path.sep)[0]
+            if split in self.scene_manifest and key in self.scene_manifest[split]:
+                return [
+                    f"{asset}.npy"
+                    for asset in self.scene_manifest[split].get_assets(key)
+                ]
+        return os.listdir(data_path)
+
+    def get_num_points(self, idx):
+        # from the index / npy header only, e.g. for point budget batching
+        data_path = self.data_list[idx % len(self.data_list)]
+        if not isinstance(data_path, str):
+            # e.g. info dicts of NuScenesDataset
+            raise NotImplementedError("Point counts need a data list of paths.")
+        key = os.path.relpath(data_path, self.data_root)
+        split = key.split(os.path.sep)[0]
+        if self.packed:
+            return self.packed_store[split].scenes[key]["coord"]["shape"][0]
+        if self.scene_manifest is not None and split in self.scene_manifest:
+            if key in self.scene_manifest[split]:
+                return self.scene_manifest[split].get_num_points(key)
+        return read_npy_header(os.path.join(data_path, "coord.npy"))[0][0]
+
+    @staticmethod
+    def cast(array, dtype):
+        # avoid a second copy when the asset already has the target dtype,
+        # read-only mappings (packed store, mmap_mode="r") still get a private copy
+        return array.astype(dtype, copy=not array.flags.writeable)
+
     def get_data_name(self, idx):
         return os.path.basename(self.data_list[idx % len(self.data_list)])
 
@@ -133,6 +241,15 @@ class DefaultDataset(Dataset):
         return data_dict
 
     def prepare_test_data(self, idx):
+        result_dict, fragments = self.get_test_fragments(idx)
+        result_dict["fragment_list"] = list(fragments)
+        return result_dict
+
+    def get_test_fragments(self, idx):
+        """
+        Return the scene level test dict (segment, name ...) and a generator of
+        the test fragments, augmented copies and fragments are produced lazily.
+        """
         # load data
         data_dict = self.get_data(idx)
         data_dict = self.transform(data_dict)
@@ -141,13 +258,13 @@ class DefaultDataset(Dataset):
             assert "inverse" in data_dict
             result_dict["origin_segment"] = data_dict.pop("origin_segment")
             result_dict["inverse"] = data_dict.pop("inverse")
+        return result_dict, self.iter_test_fragments(data_dict)
 
-        data_dict_list = []
+    def iter_test_fragments(self, data_dict):
+        # one augmented copy alive at a time, fragments come out in the same order
+        # as the materialized fragment_list
         for aug in self.aug_transform:
-            data_dict_list.append(aug(deepcopy(data_dict)))
-
-        fragment_list = []
-        for data in data_dict_list:
+            data = aug(deepcopy(data_dict))
             if self.test_voxelize is not None:
                 data_part_list = self.test_voxelize(data)
             else:
@@ -158,12 +275,8 @@ class DefaultDataset(Dataset):
                     data_part = self.test_crop(data_part)
                 else:
                     data_part = [data_part]
-                fragment_list += data_part
-
-        for i in range(len(fragment_list)):
-            fragment_list[i] = self.post_transform(fragment_list[i])
-        result_dict["fragment_list"] = fragment_list
-        return result_dict
+                for fragment in data_part:
+                    yield self.post_transform(fragment)
 
     def __getitem__(self, idx):
         if self.test_mode:
@@ -207,6 +320,10 @@ class ConcatDataset(Dataset):
         dataset_idx, data_idx = self.data_list[idx % len(self.data_list)]
         return self.datasets[dataset_idx].get_data_name(data_idx)
 
+    def get_num_points(self, idx):
+        dataset_idx, data_idx = self.data_list[idx % len(self.data_list)]
+        return self.datasets[int(dataset_idx)].get_num_points(int(data_idx))
+
     def __getitem__(self, idx):
         return self.get_data(idx)
 
@@ -10,11 +10,15 @@ Please cite our work if the code is helpful to you.
 
 import os
 import numpy as np
-import pointops
 import torch
 from torch.utils.data import Dataset
 from copy import deepcopy
 
+try:
+    import pointops
+except ImportError:
+    pointops = None
+
 
 from pointcept.utils.logger import get_root_logger
 from .builder import DATASETS
@@ -93,11 +97,16 @@ class ModelNetDataset(Dataset):
             data = np.loadtxt(data_path, delimiter=",").astype(np.float32)
             if self.num_point is not None:
                 if self.uniform_sampling:
+                    assert (
+                        pointops is not None
+                    ), "Please install pointops (libs/pointops) for uniform_sampling."
+                    # CUDA kernel if available, else the CPU backend
+                    device = "cuda" if torch.cuda.is_available() else "cpu"
                     with torch.no_grad():
                         mask = pointops.farthest_point_sampling(
-                            torch.tensor(data).float().cuda(),
-                            torch.tensor([len(data)]).long().cuda(),
-                            torch.tensor([self.num_point]).long().cuda(),
+                            torch.tensor(data).float().to(device),
+                            torch.tensor([len(data)]).long().to(device),
+                            torch.tensor([self.num_point]).long().to(device),
                         )
                     data = data[mask.cpu()]
                 else:
@@ -0,0 +1,38 @@
+"""
+Packing Data
+
+Convert Pointcept processed scenes (data_root/split/scene/*.npy) into one packed
+file per split (data_root/split.pack), read by datasets with `packed=True`.
+"""
+
+import argparse
+
+from pointcept.utils.packed import pack_scenes, PackedSceneStore
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--dataset_root",
+        required=True,
+        help="Path to the Pointcept processed dataset.",
+    )
+    parser.add_argument(
+        "--splits",
+        required=True,
+        type=str,
+        nargs="+",
+        help="Splits need to process, e.g. --splits train val test",
+    )
+    parser.add_argument(
+        "--assets",
+        default=None,
+        type=str,
+        nargs="+",
+        help="Assets to pack, e.g. --assets coord segment (default: all .npy files)",
+    )
+    config = parser.parse_args()
+
+    for split in config.splits:
+        print(f"Packing {split} split...")
+        path = pack_scenes(config.dataset_root, split, assets=config.assets)
+        print(f"Packed {len(PackedSceneStore(path))} scenes into {path}")
@@ -0,0 +1,288 @@
+"""
+Batch Samplers
+"""
+
+import math
+import heapq
+import random
+import itertools
+import numpy as np
+import torch
+import torch.utils.data
+
+from pointcept.utils.logger import get_root_logger
+
+from .builder import SAMPLERS
+
+
+@SAMPLERS.register_module()
+class PointBudgetBatchSampler(torch.utils.data.Sampler):
+    """
+    Pack shuffled samples into batches by a total point budget instead of a fixed
+    batch size. Raw point counts are read once from the dataset (get_num_points,
+    i.e. the scene size from the manifest, packed index or npy header) and
+    scaled to the points left after the transforms: by point_ratio (e.g. the
+    GridSample keep ratio, "auto" measures it on num_probe transformed samples)
+    and capped by point_max (e.g. SphereCrop point_max).
+
+    Every rank packs the same global batch list from a shared seed and takes
+    every num_replicas-th batch. The number of steps per epoch (the returned len)
+    is the median batch count of the first num_probe epochs. An epoch packing
+    into more batches drops its last batches, one packing into fewer repeats its
+    first batches, so step counts stay equal across ranks and epochs; the
+    samples dropped or repeated change with the shuffle of every epoch and are
+    logged.
+
+    Args:
+        dataset: dataset with get_num_points(idx).
+        point_budget (int): maximum total points per batch, a sample larger than
+            the budget forms a batch on its own.
+        point_ratio (float or "auto"): points after the transforms per raw point.
+        point_max (int): optional upper bound of points per sample.
+        num_probe (int): samples measured for point_ratio="auto", and epochs
+            packed for the step count.
+        max_batch_size (int): optional upper bound of samples per batch.
+        shuffle (bool): reshuffle each epoch (set_epoch).
+        drop_last (bool): drop the global batches that cannot be evenly split
+            across ranks, otherwise repeat batches to fill the last step.
+    """
+
+    def __init__(
+        self,
+        dataset,
+        point_budget=1000000,
+        point_ratio="auto",
+        point_max=None,
+        num_probe=16,
+        max_batch_size=None,
+        shuffle=True,
+        drop_last=True,
+        num_replicas=1,
+        rank=0,
+        seed=0,
+    ):
+        self.point_budget = point_budget
+        self.point_max = point_max
+        self.max_batch_size = max_batch_size
+        self.shuffle = shuffle
+        self.drop_last = drop_last
+        self.num_replicas = num_replicas
+        self.rank = rank
+        self.seed = seed if seed is not None else 0
+        self.epoch = 0
+        raw_points = self.get_num_points(dataset)
+        if point_ratio == "auto":
+            point_ratio = self.measure_ratio(dataset, raw_points, num_probe)
+        self.point_ratio = point_ratio
+        self.num_points = np.ceil(raw_points * point_ratio).astype(np.int64)
+        if point_max is not None:
+            self.num_points = np.minimum(self.num_points, point_max)
+
+        counts = [
+            len(self.pack(self.get_indices(epoch)))
+            for epoch in range(num_probe if self.shuffle else 1)
+        ]
+        num_batches = int(np.median(counts))
+        if self.drop_last:
+            self.num_batches = num_batches // self.num_replicas
+        else:
+            self.num_batches = math.ceil(num_batches / self.num_replicas)
+        assert self.num_batches > 0, "Not enough samples for the point budget."
+        logger = get_root_logger()
+        logger.info(
+            f"Point budget {point_budget} (point ratio {point_ratio:.3f}): "
+            f"{len(self.num_points)} samples in {min(counts)} - {max(counts)} "
+            f"batches, {self.num_batches} steps per rank."
+        )
+
+    @staticmethod
+    def get_num_points(dataset):
+        # samples of a looped dataset map to data_list[idx % len(data_list)]
+        data_list = getattr(dataset, "data_list", None)
+        num_scenes = len(data_list) if data_list is not None else len(dataset)
+        num_points = np.array(
+            [dataset.get_num_points(i) for i in range(num_scenes)], dtype=np.int64
+        )
+        return np.resize(num_points, len(dataset))
+
+    def measure_ratio(self, dataset, raw_points, num_probe):
+        # median points after the transforms per raw point, samples capped by
+        # point_max are left out as their ratio only reflects the cap
+        rng = np.random.default_rng(self.seed)
+        ratios = []
+        for idx in rng.choice(len(raw_points), min(num_probe, len(raw_points))):
+            sample = dataset[int(idx)]
+            num_points = (
+                int(sample["offset"][-1])
+                if "offset" in sample.keys()
+                else len(sample["coord"])
+            )
+            if self.point_max is None or num_points < self.point_max:
+                ratios.append(num_points / max(int(raw_points[idx]), 1))
+        return float(np.median(ratios)) if ratios else 1.0
+
+    def get_indices(self, epoch):
+        if self.shuffle:
+            rng = np.random.default_rng(self.seed + epoch)
+            return rng.permutation(len(self.num_points))
+        return np.arange(len(self.num_points))
+
+    def pack(self, indices):
+        batches, batch, total = [], [], 0
+        for idx, num_points in zip(indices, self.num_points[indices]):
+            full = self.max_batch_size is not None and len(batch) >= self.max_batch_size
+            if batch and (total + num_points > self.point_budget or full):
+                batches.append(batch)
+                batch, total = [], 0
+            batch.append(int(idx))
+            total += num_points
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def set_epoch(self, epoch):
+        self.epoch = epoch
+
+    def __iter__(self):
+        batches = self.pack(self.get_indices(self.epoch))
+        num_global = self.num_batches * self.num_replicas
+        if len(batches) != num_global:
+            # same on every rank, the shuffle decides which samples are affected
+            changed = batches[num_global:] or batches[: num_global - len(batches)]
+            logger = get_root_logger()
+            logger.info(
+                f"Epoch {self.epoch}: {len(batches)} batches packed, "
+                f"{'dropped' if len(batches) > num_global else 'repeated'} "
+                f"{sum(len(batch) for batch in changed)} samples to keep "
+                f"{num_global} batches."
+            )
+        batches = [batches[i % len(batches)] for i in range(num_global)]
+        yield from batches[self.rank :: self.num_replicas]
+
+    def __len__(self):
+        return self.num_batches
+
+
+class ResumableBatchSampler(torch.utils.data.Sampler):
+    """
+    Wrap a batch sampler that yields the same batches for the same epoch (e.g. a
+    BatchSampler over a seeded DistributedSampler, or PointBudgetBatchSampler) so
+    that an epoch can start at any batch (set_start) without loading the skipped
+    samples. Each index is paired with a seed derived from (seed, epoch, rank,
+    batch), which SeededDataset uses to reseed the worker before loading it, so
+    augmentations depend on the sample position only, not on worker history.
+    """
+
+    def __init__(self, batch_sampler, seed=0, rank=0):
+        self.batch_sampler = batch_sampler
+        self.seed = seed if seed is not None else 0
+        self.rank = rank
+        self.epoch = 0
+        self.start = 0
+
+    def set_epoch(self, epoch):
+        self.epoch = epoch
+        if hasattr(self.batch_sampler, "set_epoch"):
+            self.batch_sampler.set_epoch(epoch)
+        elif hasattr(getattr(self.batch_sampler, "sampler", None), "set_epoch"):
+            self.batch_sampler.sampler.set_epoch(epoch)
+
+    def set_start(self, start):
+        self.start = start
+
+    def __iter__(self):
+        batches = itertools.islice(iter(self.batch_sampler), self.start, None)
+        for i, batch in enumerate(batches, start=self.start):
+            seeds = np.random.SeedSequence(
+                [self.seed, self.epoch, self.rank, i]
+            ).generate_state(len(batch))
+            yield [(idx, int(seed)) for idx, seed in zip(batch, seeds)]
+
+    def __len__(self):
+        # length of a full epoch, iteration counters rely on it
+        return len(self.batch_sampler)
+
+
+class SeededDataset(torch.utils.data.Dataset):
+    """
+    Dataset wrapper used with ResumableBatchSampler: reseed random, numpy and
+    torch with the seed paired with each index before loading the sample.
+    """
+
+    def __init__(self, dataset):
+        self.dataset = dataset
+
+    def __getattr__(self, name):
+        # data_list, transform, cache ... of the wrapped dataset
+        if name == "dataset":
+            raise AttributeError(name)
+        return getattr(self.dataset, name)
+
+    def __len__(self):
+        return len(self.dataset)
+
+    def __getitem__(self, item):
+        idx, seed = item
+        random.seed(seed)
+        np.random.seed(seed)
+        torch.manual_seed(seed)
+        return self.dataset[idx]
+
+
+def balance_by_size(sizes, num_replicas):
+    """
+    Longest processing time first: assign items, largest first, to the replica
+    with the smallest total size so far. Return the item indices of each replica,
+    largest first.
+    """
+    loads = [(0, replica) for replica in range(num_replicas)]
+    shards = [[] for _ in range(num_replicas)]
+    for idx in np.argsort(-np.asarray(sizes), kind="stable"):
+        load, replica = heapq.heappop(loads)
+        shards[replica].append(int(idx))
+        heapq.heappush(loads, (load + int(sizes[idx]), replica))
+    return shards
+
+
+class SizeBalancedSampler(torch.utils.data.Sampler):
+    """
+    Test sampler assigning every sample to exactly one rank (no padded
+    duplicates), balanced by point count (get_num_points, i.e. packed index,
+    manifest or npy header) with longest processing time first. Datasets
+    without point counts are balanced by sample count.
+    """
+
+    def __init__(self, dataset, num_replicas=1, rank=0):
+        self.num_replicas = num_replicas
+        self.rank = rank
+        self.sizes = self.get_sizes(dataset)
+        self.indices = balance_by_size(self.sizes, num_replicas)[rank]
+        logger = get_root_logger()
+        logger.info(
+            f"Rank {rank}: {len(self.indices)} / {len(self.sizes)} samples, "
+            f"{self.sizes[self.indices].sum()} / {self.sizes.sum()} points."
+        )
+
+    @staticmethod
+    def get_sizes(dataset):
+        try:
+            return np.array(
+                [dataset.get_num_points(i) for i in range(len(dataset))],
+                dtype=np.int64,
+            )
+        except (
+            AttributeError,
+            NotImplementedError,
+            OSError,
+            KeyError,
+            TypeError,
+            ValueError,
+        ):
+            # e.g. datasets storing points in other formats than coord.npy
+            return np.ones(len(dataset), dtype=np.int64)
+
+    def __iter__(self):
+        return iter(self.indices)
+
+    def __len__(self):
+        return len(self.indices)
@@ -14,7 +14,6 @@ from torch.utils.data import Dataset
 from collections.abc import Sequence
 
 from pointcept.utils.logger import get_root_logger
-from pointcept.utils.cache import shared_dict
 from .builder import DATASETS
 from .defaults import DefaultDataset
 from .transform import Compose, TRANSFORMS
@@ -57,30 +56,19 @@ class ScanNetDataset(DefaultDataset):
     def get_data(self, idx):
         data_path = self.data_list[idx % len(self.data_list)]
         name = self.get_data_name(idx)
-        if self.cache:
-            cache_name = f"pointcept-{name}"
-            return shared_dict(cache_name)
-
-        data_dict = {}
-        assets = os.listdir(data_path)
-        for asset in assets:
-            if not asset.endswith(".npy"):
-                continue
-            if asset[:-4] not in self.VALID_ASSETS:
-                continue
-            data_dict[asset[:-4]] = np.load(os.path.join(data_path, asset))
+        data_dict = self.load_assets(data_path)
         data_dict["name"] = name
-        data_dict["coord"] = data_dict["coord"].astype(np.float32)
-        data_dict["color"] = data_dict["color"].astype(np.float32)
-        data_dict["normal"] = data_dict["normal"].astype(np.float32)
+        data_dict["coord"] = self.cast(data_dict["coord"], np.float32)
+        data_dict["color"] = self.cast(data_dict["color"], np.float32)
+        data_dict["normal"] = self.cast(data_dict["normal"], np.float32)
 
         if "segment20" in data_dict.keys():
-            data_dict["segment"] = (
-                data_dict.pop("segment20").reshape([-1]).astype(np.int32)
+            data_dict["segment"] = self.cast(
+                data_dict.pop("segment20").reshape([-1]), np.int32
             )
         elif "segment200" in data_dict.keys():
-            data_dict["segment"] = (
-                data_dict.pop("segment200").reshape([-1]).astype(np.int32)
+            data_dict["segment"] = self.cast(
+                data_dict.pop("segment200").reshape([-1]), np.int32
             )
         else:
             data_dict["segment"] = (
@@ -88,8 +76,8 @@ class ScanNetDataset(DefaultDataset):
             )
 
         if "instance" in data_dict.keys():
-            data_dict["instance"] = (
-                data_dict.pop("instance").reshape([-1]).astype(np.int32)
+            data_dict["instance"] = self.cast(
+                data_dict.pop("instance").reshape([-1]), np.int32
             )
         else:
             data_dict["instance"] = (
@@ -0,0 +1,83 @@
+"""
+Streaming Test Fragments
+
+Produce the test fragments of scenes as a stream of packed fragment batches in
+DataLoader workers, so that the tester infers the first fragments of a scene
+while later ones are still being generated, instead of waiting for the whole
+fragment_list of the scene.
+"""
+
+import torch.utils.data
+
+from .utils import collate_fn
+
+
+def pack_fragments(fragments, point_budget=None):
+    """
+    Pack an iterable of fragments into batches of at most point_budget points
+    (a larger fragment forms a batch on its own), None for one fragment per
+    batch. Batches are yielded as soon as they are full.
+    """
+    batch, total = [], 0
+    for fragment in fragments:
+        num_points = fragment["coord"].shape[0]
+        if batch and (point_budget is None or total + num_points > point_budget):
+            yield batch
+            batch, total = [], 0
+        batch.append(fragment)
+        total += num_points
+    if batch:
+        yield batch
+
+
+class FragmentStream(torch.utils.data.IterableDataset):
+    """
+    Stream the test fragments of dataset[indices]. For each scene it yields
+    dict(scene=i, header=..., skip=...) with the scene level dict (segment,
+    name ...), then dict(scene=i, batch=...) for every collated fragment batch,
+    then dict(scene=i, num_batches=n). Each DataLoader worker streams a disjoint
+    subset of the scenes, so items of different scenes may interleave, the
+    items of one scene keep their order. The DataLoader prefetch queue
+    (num_workers x prefetch_factor items) bounds the fragments held in memory.
+
+    Scenes in skip (e.g. already predicted) yield no fragment batch. Datasets
+    without get_test_fragments fall back to their materialized fragment_list.
+    """
+
+    def __init__(self, dataset, indices=None, point_budget=None, skip=()):
+        self.dataset = dataset
+        self.indices = list(indices) if indices is not None else range(len(dataset))
+        self.point_budget = point_budget
+        self.skip = set(skip)
+
+    def __getattr__(self, name):
+        # class2id, learning_map_inv ... of the wrapped dataset
+        if name == "dataset":
+            raise AttributeError(name)
+        return getattr(self.dataset, name)
+
+    @property
+    def num_scenes(self):
+        return len(self.indices)
+
+    def get_test_fragments(self, idx):
+        if hasattr(self.dataset, "get_test_fragments"):
+            return self.dataset.get_test_fragments(idx)
+        data_dict = self.dataset[idx]
+        return data_dict, iter(data_dict.pop("fragment_list"))
+
+    def __iter__(self):
+        worker_info = torch.utils.data.get_worker_info()
+        scenes = range(len(self.indices))
+        if worker_info is not None:
+            scenes = scenes[worker_info.id :: worker_info.num_workers]
+        for scene in scenes:
+            idx = self.indices[scene]
+            header, fragments = self.get_test_fragments(idx)
+            yield dict(scene=scene, header=header, skip=idx in self.skip)
+            num_batches = 0
+            if idx not in self.skip:
+                for batch in pack_fragments(fragments, self.point_budget):
+                    yield dict(scene=scene, batch=collate_fn(batch))
+                    num_batches += 1
+            yield dict(scene=scene, num_batches=num_batches)
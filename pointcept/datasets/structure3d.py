@@ -15,7 +15,11 @@ from .builder import DATASETS
 
 @DATASETS.register_module()
 class Structured3DDataset(DefaultDataset):
+    SCENE_PATTERN = "scene_*/room_*"
+
     def get_data_list(self):
+        if self.packed or self.scene_manifest is not None:
+            return super().get_data_list()
         if isinstance(self.split, str):
             data_list = glob.glob(
                 os.path.join(self.data_root, self.split, "scene_*/room_*")
@@ -9,8 +9,12 @@ Please cite our work if the code is helpful to you.
 
 import random
 import numbers
+import json
+import time
+import tracemalloc
 import scipy
 import scipy.ndimage
+import scipy.spatial
 import scipy.interpolate
 import scipy.stats
 import numpy as np
@@ -156,6 +160,17 @@ class CenterShift(object):
             data_dict["coord"] -= shift
         return data_dict
 
+    def get_affine(self, data_dict, get_coord):
+        affine = np.eye(4)
+        if "coord" in data_dict.keys():
+            coord = get_coord()
+            x_min, y_min, z_min = coord.min(axis=0)
+            x_max, y_max, _ = coord.max(axis=0)
+            affine[0, 3] = -(x_min + x_max) / 2
+            affine[1, 3] = -(y_min + y_max) / 2
+            affine[2, 3] = -z_min if self.apply_z else 0
+        return affine, None
+
 
 @TRANSFORMS.register_module()
 class RandomShift(object):
@@ -170,6 +185,14 @@ class RandomShift(object):
             data_dict["coord"] += [shift_x, shift_y, shift_z]
         return data_dict
 
+    def get_affine(self, data_dict, get_coord):
+        if "coord" not in data_dict.keys():
+            return None, None
+        affine = np.eye(4)
+        for i in range(3):
+            affine[i, 3] = np.random.uniform(self.shift[i][0], self.shift[i][1])
+        return affine, None
+
 
 @TRANSFORMS.register_module()
 class PointClip(object):
@@ -220,6 +243,36 @@ class RandomDropout(object):
         return data_dict
 
 
+def rotation_matrix(angle, axis="z"):
+    rot_cos, rot_sin = np.cos(angle), np.sin(angle)
+    if axis == "x":
+        rot_t = np.array([[1, 0, 0], [0, rot_cos, -rot_sin], [0, rot_sin, rot_cos]])
+    elif axis == "y":
+        rot_t = np.array([[rot_cos, 0, rot_sin], [0, 1, 0], [-rot_sin, 0, rot_cos]])
+    elif axis == "z":
+        rot_t = np.array([[rot_cos, -rot_sin, 0], [rot_sin, rot_cos, 0], [0, 0, 1]])
+    else:
+        raise NotImplementedError
+    return rot_t
+
+
+def rotation_affine(rot_t, data_dict, center, get_coord):
+    """
+    4x4 affine of a rotation around center (bounding box center if None).
+    """
+    affine = np.eye(4)
+    affine[:3, :3] = rot_t
+    if "coord" in data_dict.keys():
+        if center is None:
+            coord = get_coord()
+            x_min, y_min, z_min = coord.min(axis=0)
+            x_max, y_max, z_max = coord.max(axis=0)
+            center = [(x_min + x_max) / 2, (y_min + y_max) / 2, (z_min + z_max) / 2]
+        center = np.array(center, dtype=np.float64)
+        affine[:3, 3] = center - rot_t @ center
+    return affine
+
+
 @TRANSFORMS.register_module()
 class RandomRotate(object):
     def __init__(self, angle=None, center=None, axis="z", always_apply=False, p=0.5):
@@ -233,15 +286,7 @@ class RandomRotate(object):
         if random.random() > self.p:
             return data_dict
         angle = np.random.uniform(self.angle[0], self.angle[1]) * np.pi
-        rot_cos, rot_sin = np.cos(angle), np.sin(angle)
-        if self.axis == "x":
-            rot_t = np.array([[1, 0, 0], [0, rot_cos, -rot_sin], [0, rot_sin, rot_cos]])
-        elif self.axis == "y":
-            rot_t = np.array([[rot_cos, 0, rot_sin], [0, 1, 0], [-rot_sin, 0, rot_cos]])
-        elif self.axis == "z":
-            rot_t = np.array([[rot_cos, -rot_sin, 0], [rot_sin, rot_cos, 0], [0, 0, 1]])
-        else:
-            raise NotImplementedError
+        rot_t = rotation_matrix(angle, self.axis)
         if "coord" in data_dict.keys():
             if self.center is None:
                 x_min, y_min, z_min = data_dict["coord"].min(axis=0)
@@ -256,6 +301,13 @@ class RandomRotate(object):
             data_dict["normal"] = np.dot(data_dict["normal"], np.transpose(rot_t))
         return data_dict
 
+    def get_affine(self, data_dict, get_coord):
+        if random.random() > self.p:
+            return None, None
+        angle = np.random.uniform(self.angle[0], self.angle[1]) * np.pi
+        rot_t = rotation_matrix(angle, self.axis)
+        return rotation_affine(rot_t, data_dict, self.center, get_coord), rot_t
+
 
 @TRANSFORMS.register_module()
 class RandomRotateTargetAngle(object):
@@ -272,15 +324,7 @@ class RandomRotateTargetAngle(object):
         if random.random() > self.p:
             return data_dict
         angle = np.random.choice(self.angle) * np.pi
-        rot_cos, rot_sin = np.cos(angle), np.sin(angle)
-        if self.axis == "x":
-            rot_t = np.array([[1, 0, 0], [0, rot_cos, -rot_sin], [0, rot_sin, rot_cos]])
-        elif self.axis == "y":
-            rot_t = np.array([[rot_cos, 0, rot_sin], [0, 1, 0], [-rot_sin, 0, rot_cos]])
-        elif self.axis == "z":
-            rot_t = np.array([[rot_cos, -rot_sin, 0], [rot_sin, rot_cos, 0], [0, 0, 1]])
-        else:
-            raise NotImplementedError
+        rot_t = rotation_matrix(angle, self.axis)
         if "coord" in data_dict.keys():
             if self.center is None:
                 x_min, y_min, z_min = data_dict["coord"].min(axis=0)
@@ -295,6 +339,13 @@ class RandomRotateTargetAngle(object):
             data_dict["normal"] = np.dot(data_dict["normal"], np.transpose(rot_t))
         return data_dict
 
+    def get_affine(self, data_dict, get_coord):
+        if random.random() > self.p:
+            return None, None
+        angle = np.random.choice(self.angle) * np.pi
+        rot_t = rotation_matrix(angle, self.axis)
+        return rotation_affine(rot_t, data_dict, self.center, get_coord), rot_t
+
 
 @TRANSFORMS.register_module()
 class RandomScale(object):
@@ -310,6 +361,16 @@ class RandomScale(object):
             data_dict["coord"] *= scale
         return data_dict
 
+    def get_affine(self, data_dict, get_coord):
+        if "coord" not in data_dict.keys():
+            return None, None
+        scale = np.random.uniform(
+            self.scale[0], self.scale[1], 3 if self.anisotropic else 1
+        )
+        affine = np.eye(4)
+        affine[[0, 1, 2], [0, 1, 2]] = scale
+        return affine, None
+
 
 @TRANSFORMS.register_module()
 class RandomFlip(object):
@@ -329,6 +390,18 @@ class RandomFlip(object):
                 data_dict["normal"][:, 1] = -data_dict["normal"][:, 1]
         return data_dict
 
+    def get_affine(self, data_dict, get_coord):
+        flip = np.ones(3)
+        if np.random.rand() < self.p:
+            flip[0] = -1
+        if np.random.rand() < self.p:
+            flip[1] = -1
+        if np.all(flip == 1):
+            return None, None
+        affine = np.eye(4)
+        affine[[0, 1, 2], [0, 1, 2]] = flip
+        return affine, np.diag(flip)
+
 
 @TRANSFORMS.register_module()
 class RandomJitter(object):
@@ -810,19 +883,16 @@ class GridSample(object):
         assert "coord" in data_dict.keys()
         scaled_coord = data_dict["coord"] / np.array(self.grid_size)
         grid_coord = np.floor(scaled_coord).astype(int)
-        min_coord = grid_coord.min(0)
+        # column-wise reduction, axis=0 reductions of (N, 3) arrays are much slower
+        min_coord = np.array([column.min() for column in grid_coord.T])
         grid_coord -= min_coord
         scaled_coord -= min_coord
         min_coord = min_coord * np.array(self.grid_size)
         key = self.hash(grid_coord)
         idx_sort = np.argsort(key)
-        key_sort = key[idx_sort]
-        _, inverse, count = np.unique(key_sort, return_inverse=True, return_counts=True)
+        inverse, count, start = self.group_sorted(key[idx_sort])
         if self.mode == "train":  # train mode
-            idx_select = (
-                np.cumsum(np.insert(count, 0, 0)[0:-1])
-                + np.random.randint(0, count.max(), count.size) % count
-            )
+            idx_select = start + np.random.randint(0, count.max(), count.size) % count
             idx_unique = idx_sort[idx_select]
             if "sampled_index" in data_dict:
                 # for ScanNet data efficient, we need to make sure labeled point is sampled.
@@ -835,72 +905,94 @@ class GridSample(object):
             if self.return_inverse:
                 data_dict["inverse"] = np.zeros_like(inverse)
                 data_dict["inverse"][idx_sort] = inverse
+            # np.take is several times faster than fancy indexing of (N, C) arrays
+            grid_coord = np.take(grid_coord, idx_unique, axis=0)
             if self.return_grid_coord:
-                data_dict["grid_coord"] = grid_coord[idx_unique]
+                data_dict["grid_coord"] = grid_coord
             if self.return_min_coord:
                 data_dict["min_coord"] = min_coord.reshape([1, 3])
             if self.return_displacement:
                 displacement = (
-                    scaled_coord - grid_coord - 0.5
+                    np.take(scaled_coord, idx_unique, axis=0) - grid_coord - 0.5
                 )  # [0, 1] -> [-0.5, 0.5] displacement to center
                 if self.project_displacement:
                     displacement = np.sum(
-                        displacement * data_dict["normal"], axis=-1, keepdims=True
+                        displacement * np.take(data_dict["normal"], idx_unique, axis=0),
+                        axis=-1,
+                        keepdims=True,
                     )
-                data_dict["displacement"] = displacement[idx_unique]
+                data_dict["displacement"] = displacement
             for key in self.keys:
-                data_dict[key] = data_dict[key][idx_unique]
+                data_dict[key] = np.take(data_dict[key], idx_unique, axis=0)
             return data_dict
 
         elif self.mode == "test":  # test mode
+            # everything not depending on the part is computed once for the scene
+            if self.return_inverse:
+                data_dict["inverse"] = np.zeros_like(inverse)
+                data_dict["inverse"][idx_sort] = inverse
+            if self.return_min_coord:
+                min_coord = min_coord.reshape([1, 3])
+            if self.return_displacement:
+                displacement = (
+                    scaled_coord - grid_coord - 0.5
+                )  # [0, 1] -> [-0.5, 0.5] displacement to center
+                if self.project_displacement:
+                    displacement = np.sum(
+                        displacement * data_dict["normal"], axis=-1, keepdims=True
+                    )
+            # arrays outside keys are shared by reference among all parts
+            keys = [key for key in data_dict.keys() if key in self.keys]
+            shared = {
+                key: value for key, value in data_dict.items() if key not in self.keys
+            }
             data_part_list = []
+            # part i takes the (i % count)-th point of each voxel in sorted order
             for i in range(count.max()):
-                idx_select = np.cumsum(np.insert(count, 0, 0)[0:-1]) + i % count
-                idx_part = idx_sort[idx_select]
+                idx_part = idx_sort[start + i % count]
                 data_part = dict(index=idx_part)
-                if self.return_inverse:
-                    data_dict["inverse"] = np.zeros_like(inverse)
-                    data_dict["inverse"][idx_sort] = inverse
                 if self.return_grid_coord:
-                    data_part["grid_coord"] = grid_coord[idx_part]
+                    data_part["grid_coord"] = np.take(grid_coord, idx_part, axis=0)
                 if self.return_min_coord:
-                    data_part["min_coord"] = min_coord.reshape([1, 3])
+                    data_part["min_coord"] = min_coord
                 if self.return_displacement:
-                    displacement = (
-                        scaled_coord - grid_coord - 0.5
-                    )  # [0, 1] -> [-0.5, 0.5] displacement to center
-                    if self.project_displacement:
-                        displacement = np.sum(
-                            displacement * data_dict["normal"], axis=-1, keepdims=True
-                        )
-                    data_dict["displacement"] = displacement[idx_part]
-                for key in data_dict.keys():
-                    if key in self.keys:
-                        data_part[key] = data_dict[key][idx_part]
-                    else:
-                        data_part[key] = data_dict[key]
+                    data_part["displacement"] = np.take(displacement, idx_part, axis=0)
+                data_part.update(shared)
+                for key in keys:
+                    data_part[key] = np.take(data_dict[key], idx_part, axis=0)
                 data_part_list.append(data_part)
             return data_part_list
         else:
             raise NotImplementedError
 
+    @staticmethod
+    def group_sorted(key_sort):
+        """
+        Group sorted keys in a single linear pass. Equivalent to
+        np.unique(key_sort, return_inverse=True, return_counts=True) (which sorts
+        again), additionally returning the start of each group in key_sort.
+        """
+        mask = np.empty(key_sort.shape[0], dtype=bool)
+        mask[:1] = True
+        np.not_equal(key_sort[1:], key_sort[:-1], out=mask[1:])
+        inverse = np.cumsum(mask) - 1
+        start = np.flatnonzero(mask)
+        count = np.diff(start, append=key_sort.shape[0])
+        return inverse, count, start
+
     @staticmethod
     def ravel_hash_vec(arr):
         """
         Ravel the coordinates after subtracting the min coordinates.
         """
         assert arr.ndim == 2
-        arr = arr.copy()
-        arr -= arr.min(0)
-        arr = arr.astype(np.uint64, copy=False)
-        arr_max = arr.max(0).astype(np.uint64) + 1
-
+        # Fortran style indexing, one column at a time without copying arr
         keys = np.zeros(arr.shape[0], dtype=np.uint64)
-        # Fortran style indexing
-        for j in range(arr.shape[1] - 1):
-            keys += arr[:, j]
-            keys *= arr_max[j + 1]
-        keys += arr[:, -1]
+        for j, column in enumerate(arr.T):
+            column = (column - column.min()).astype(np.uint64)
+            if j > 0:
+                keys *= column.max() + np.uint64(1)
+            keys += column
         return keys
 
     @staticmethod
@@ -910,17 +1002,65 @@ class GridSample(object):
         """
         assert arr.ndim == 2
         # Floor first for negative coordinates
-        arr = arr.copy()
-        arr = arr.astype(np.uint64, copy=False)
-        hashed_arr = np.uint64(14695981039346656037) * np.ones(
-            arr.shape[0], dtype=np.uint64
-        )
+        prime = np.uint64(1099511628211)
+        hashed_arr = np.full(arr.shape[0], 14695981039346656037, dtype=np.uint64)
         for j in range(arr.shape[1]):
-            hashed_arr *= np.uint64(1099511628211)
-            hashed_arr = np.bitwise_xor(hashed_arr, arr[:, j])
+            np.multiply(hashed_arr, prime, out=hashed_arr)
+            np.bitwise_xor(hashed_arr, arr[:, j].astype(np.uint64), out=hashed_arr)
         return hashed_arr
 
 
+@TRANSFORMS.register_module()
+class Serialize(object):
+    """
+    Serialize a sample in the data pipeline instead of in the model forward.
+    Adds serial_code, serial_order and serial_inverse of shape (n, k) for the
+    k orders (codes without batch bits, orders sorting the sample), serial_type
+    (index of each order in ORDERS) and serial_depth. Collate merges them into
+    batched orders by offset (see merge_serialization, mix_serialization for
+    Mix3d), Point.serialization then uses them only if the model serializes
+    with the same orders at the same depth, and recomputes them otherwise. For
+    PTv3, set serialization_depth of the backbone to the same fixed depth.
+
+    Place after GridSample (return_grid_coord=True) and the augmentations
+    changing grid_coord, and add the keys to Collect.
+    """
+
+    def __init__(self, order=("z", "z-trans", "hilbert", "hilbert-trans"), depth=16):
+        # same encoders as the model, imported here to keep the model package
+        # out of the dataset imports
+        from pointcept.models.utils.serialization import encode, ORDERS
+
+        self.order = [order] if isinstance(order, str) else list(order)
+        assert set(self.order).issubset(ORDERS)
+        self.type = np.array([ORDERS.index(order) for order in self.order])
+        self.depth = depth
+        self.encode = encode
+
+    def __call__(self, data_dict):
+        grid_coord = torch.as_tensor(data_dict["grid_coord"]).long()
+        assert grid_coord.min() >= 0 and grid_coord.max() < 2**self.depth, (
+            f"grid_coord exceeds the serialization depth {self.depth}, "
+            "increase depth (at most 16)."
+        )
+        code = torch.stack(
+            [
+                self.encode(grid_coord, depth=self.depth, order=order)
+                for order in self.order
+            ],
+            dim=1,
+        ).numpy()
+        order = np.argsort(code, axis=0, kind="stable")
+        inverse = np.empty_like(order)
+        np.put_along_axis(inverse, order, np.arange(code.shape[0])[:, None], axis=0)
+        data_dict["serial_code"] = code
+        data_dict["serial_order"] = order
+        data_dict["serial_inverse"] = inverse
+        data_dict["serial_type"] = self.type.copy()
+        data_dict["serial_depth"] = np.array([self.depth])
+        return data_dict
+
+
 @TRANSFORMS.register_module()
 class SphereCrop(object):
     def __init__(self, point_max=80000, sample_rate=None, mode="random"):
@@ -930,6 +1070,11 @@ class SphereCrop(object):
         self.mode = mode
 
     def __call__(self, data_dict):
+        """
+        mode="all" returns the list of crops covering the scene, each crop has
+        "cover_stats" (num_points, num_crops, mean_overlap, max_overlap of the
+        cover), computed where the crop runs (e.g. in DataLoader workers).
+        """
         point_max = (
             int(self.sample_rate * data_dict["coord"].shape[0])
             if self.sample_rate is not None
@@ -938,54 +1083,70 @@ class SphereCrop(object):
 
         assert "coord" in data_dict.keys()
         if self.mode == "all":
-            # TODO: Optimize
             if "index" not in data_dict.keys():
                 data_dict["index"] = np.arange(data_dict["coord"].shape[0])
             data_part_list = []
             # coord_list, color_list, dist2_list, idx_list, offset_list = [], [], [], [], []
             if data_dict["coord"].shape[0] > point_max:
-                coord_p, idx_uni = np.random.rand(
-                    data_dict["coord"].shape[0]
-                ) * 1e-3, np.array([])
-                while idx_uni.size != data_dict["index"].shape[0]:
+                num_points = data_dict["coord"].shape[0]
+                coord_p = np.random.rand(num_points) * 1e-3
+                # each crop is a k nearest neighbor query instead of a full scene sort
+                tree = scipy.spatial.cKDTree(
+                    data_dict["coord"], balanced_tree=False, compact_nodes=False
+                )
+                overlap = np.zeros(num_points, dtype=np.int32)
+                num_covered = 0
+                while num_covered != num_points:
                     init_idx = np.argmin(coord_p)
+                    center = data_dict["coord"][init_idx]
+                    _, idx_crop = tree.query(center, k=point_max)
                     dist2 = np.sum(
-                        np.power(data_dict["coord"] - data_dict["coord"][init_idx], 2),
+                        np.square(
+                            np.take(data_dict["coord"], idx_crop, axis=0) - center
+                        ),
                         1,
                     )
-                    idx_crop = np.argsort(dist2)[:point_max]
 
                     data_crop_dict = dict()
-                    if "coord" in data_dict.keys():
-                        data_crop_dict["coord"] = data_dict["coord"][idx_crop]
-                    if "grid_coord" in data_dict.keys():
-                        data_crop_dict["grid_coord"] = data_dict["grid_coord"][idx_crop]
-                    if "normal" in data_dict.keys():
-                        data_crop_dict["normal"] = data_dict["normal"][idx_crop]
-                    if "color" in data_dict.keys():
-                        data_crop_dict["color"] = data_dict["color"][idx_crop]
-                    if "displacement" in data_dict.keys():
-                        data_crop_dict["displacement"] = data_dict["displacement"][
-                            idx_crop
-                        ]
-                    if "strength" in data_dict.keys():
-                        data_crop_dict["strength"] = data_dict["strength"][idx_crop]
-                    data_crop_dict["weight"] = dist2[idx_crop]
+                    for key in [
+                        "coord",
+                        "grid_coord",
+                        "normal",
+                        "color",
+                        "displacement",
+                        "strength",
+                    ]:
+                        if key in data_dict.keys():
+                            data_crop_dict[key] = np.take(
+                                data_dict[key], idx_crop, axis=0
+                            )
+                    data_crop_dict["weight"] = dist2
                     data_crop_dict["index"] = data_dict["index"][idx_crop]
                     data_part_list.append(data_crop_dict)
 
-                    delta = np.square(
-                        1 - data_crop_dict["weight"] / np.max(data_crop_dict["weight"])
-                    )
+                    delta = np.square(1 - dist2 / np.max(dist2))
                     coord_p[idx_crop] += delta
-                    idx_uni = np.unique(
-                        np.concatenate((idx_uni, data_crop_dict["index"]))
-                    )
+                    num_covered += np.count_nonzero(overlap[idx_crop] == 0)
+                    overlap[idx_crop] += 1
+                cover_stats = dict(
+                    num_points=num_points,
+                    num_crops=len(data_part_list),
+                    mean_overlap=float(overlap.mean()),
+                    max_overlap=int(overlap.max()),
+                )
             else:
                 data_crop_dict = data_dict.copy()
                 data_crop_dict["weight"] = np.zeros(data_dict["coord"].shape[0])
                 data_crop_dict["index"] = data_dict["index"]
                 data_part_list.append(data_crop_dict)
+                cover_stats = dict(
+                    num_points=data_dict["coord"].shape[0],
+                    num_crops=1,
+                    mean_overlap=1.0,
+                    max_overlap=1,
+                )
+            for data_crop_dict in data_part_list:
+                data_crop_dict["cover_stats"] = cover_stats
             return data_part_list
         # mode is "random" or "center"
         elif data_dict["coord"].shape[0] > point_max:
@@ -1137,14 +1298,121 @@ class InstanceParser(object):
         return data_dict
 
 
+class FusedAffine(object):
+    """
+    Consecutive affine transforms (transforms with get_affine) applied as one
+    4x4 matrix on coord and one 3x3 matrix on normal. Parameters are sampled in
+    the same order as calling the transforms one by one, the pending matrix is
+    only applied early when a transform needs the current coord (e.g. the
+    bounding box center of CenterShift or RandomRotate with center=None).
+    """
+
+    def __init__(self, transforms):
+        self.transforms = transforms
+
+    @staticmethod
+    def apply(data_dict, affine, normal):
+        if affine is not None and "coord" in data_dict.keys():
+            coord = data_dict["coord"]
+            dtype = coord.dtype if np.issubdtype(coord.dtype, np.floating) else None
+            coord = np.dot(coord, affine[:3, :3].T.astype(dtype, copy=False))
+            coord += affine[:3, 3].astype(coord.dtype, copy=False)
+            data_dict["coord"] = coord
+        if normal is not None and "normal" in data_dict.keys():
+            normal_ = data_dict["normal"]
+            data_dict["normal"] = np.dot(normal_, normal.T.astype(normal_.dtype))
+
+    def __call__(self, data_dict):
+        pending = dict(affine=None, normal=None)
+
+        def get_coord():
+            self.apply(data_dict, pending["affine"], pending["normal"])
+            pending.update(affine=None, normal=None)
+            return data_dict["coord"]
+
+        for t in self.transforms:
+            affine, normal = t.get_affine(data_dict, get_coord)
+            if affine is not None:
+                pending["affine"] = (
+                    affine if pending["affine"] is None else affine @ pending["affine"]
+                )
+            if normal is not None:
+                pending["normal"] = (
+                    normal if pending["normal"] is None else normal @ pending["normal"]
+                )
+        self.apply(data_dict, pending["affine"], pending["normal"])
+        return data_dict
+
+
 class Compose(object):
-    def __init__(self, cfg=None):
+    def __init__(self, cfg=None, fuse=False, profile=False):
         self.cfg = cfg if cfg is not None else []
         self.transforms = []
         for t_cfg in self.cfg:
             self.transforms.append(TRANSFORMS.build(t_cfg))
+        if fuse:
+            self.transforms = self.fuse_affine(self.transforms)
+        # record per-transform time, points and allocation, see TransformProfiler
+        self.profile = profile
+
+    @staticmethod
+    def fuse_affine(transforms):
+        fused, group = [], []
+        for t in transforms + [None]:
+            if t is not None and hasattr(t, "get_affine"):
+                group.append(t)
+                continue
+            if len(group) > 1:
+                fused.append(FusedAffine(group))
+            else:
+                fused.extend(group)
+            group = []
+            if t is not None:
+                fused.append(t)
+        return fused
 
     def __call__(self, data_dict):
+        if self.profile:
+            return self.profile_call(data_dict)
+        for t in self.transforms:
+            data_dict = t(data_dict)
+        return data_dict
+
+    def get_names(self):
+        names = []
         for t in self.transforms:
+            name = type(t).__name__
+            # repeated transforms (e.g. CenterShift before and after GridSample)
+            count = sum(n.split("#")[0] == name for n in names)
+            names.append(f"{name}#{count + 1}" if count else name)
+        return names
+
+    @staticmethod
+    def count_points(data):
+        if isinstance(data, Mapping):
+            return data["coord"].shape[0] if "coord" in data.keys() else 0
+        elif isinstance(data, Sequence):
+            return sum(Compose.count_points(d) for d in data)
+        return 0
+
+    def profile_call(self, data_dict):
+        """
+        Run the transforms and record [seconds, input points, output points,
+        peak allocated bytes] for each of them as a json string in
+        data_dict["transform_profile"], which is collated as a list of str.
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        record = {}
+        for name, t in zip(self.get_names(), self.transforms):
+            num_in = self.count_points(data_dict)
+            tracemalloc.reset_peak()
+            memory = tracemalloc.get_traced_memory()[0]
+            start = time.perf_counter()
             data_dict = t(data_dict)
+            seconds = time.perf_counter() - start
+            allocated = tracemalloc.get_traced_memory()[1] - memory
+            record[name] = [seconds, num_in, self.count_points(data_dict), allocated]
+        if isinstance(data_dict, Mapping):
+            data_dict["transform_profile"] = json.dumps(record)
         return data_dict
@@ -0,0 +1,425 @@
+"""
+Shared Memory Batch Transport
+
+Move collated batches from DataLoader workers to the main process through a
+ring of preallocated shared memory slabs (/dev/shm files) instead of pickling
+every tensor into a fresh shared memory file. Workers collate directly into a
+free slab and send back a small descriptor; the main process hands out views
+into the slab and recycles it once the next batch is requested.
+"""
+
+import os
+import queue
+import random
+import weakref
+import multiprocessing as mp
+from functools import partial
+import torch
+import torch.utils.data
+
+from pointcept.utils.logger import get_root_logger
+
+from .utils import (
+    point_collate_fn,
+    is_flat_tensor_dict,
+    merge_serialization,
+    mix_serialization,
+)
+from .sampler import SeededDataset
+
+ALIGNMENT = 64
+SLAB_PREFIX = "pointcept-slab-"
+
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _remove_slabs(paths, owner):
+    if os.getpid() != owner:
+        return
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class SlabBatch(object):
+    """
+    Descriptor of a batch written into slab slab_id of ring generation
+    generation: layout maps each tensor key to (offset, dtype, shape), mix marks
+    a Mix3d batch (see point_collate_fn).
+    """
+
+    def __init__(self, slab_id, generation, layout, mix=False):
+        self.slab_id = slab_id
+        self.generation = generation
+        self.layout = layout
+        self.mix = mix
+
+
+class SlabRing(object):
+    """
+    Ring of num_slabs shared memory slabs of slab_size bytes each. Free slab ids
+    circulate through a multiprocessing queue shared with DataLoader workers,
+    tagged with the ring generation: reset() starts a new generation with every
+    slab free, ids of older generations (e.g. held by batches discarded when an
+    iteration stopped early) are dropped instead of recycled.
+
+    Slabs are removed when the ring is garbage collected or at exit, slabs left
+    behind by killed processes are removed when the next ring is created.
+    """
+
+    def __init__(self, num_slabs, slab_size, root="/dev/shm", pin_memory=False):
+        self.num_slabs = num_slabs
+        self.slab_size = slab_size
+        self.root = root
+        self.owner = os.getpid()
+        self.cleanup_stale(root)
+        self.paths = [
+            os.path.join(root, f"{SLAB_PREFIX}{self.owner}-{i}")
+            for i in range(num_slabs)
+        ]
+        for path in self.paths:
+            # sparse file, tmpfs only backs the pages that are written
+            with open(path, "wb") as f:
+                f.truncate(slab_size)
+        self.free = mp.get_context().Queue()
+        self.generation = mp.get_context().Value("i", 0)
+        for slab_id in range(num_slabs):
+            self.free.put((0, slab_id))
+        self._slabs = {}
+        # slabs registered as pinned memory are released once their copies finish
+        self.pin_memory = pin_memory and torch.cuda.is_available()
+        self._pending = []
+        self._finalizer = weakref.finalize(
+            self, _remove_slabs, list(self.paths), self.owner
+        )
+
+    @staticmethod
+    def cleanup_stale(root="/dev/shm"):
+        for name in os.listdir(root):
+            if not name.startswith(SLAB_PREFIX):
+                continue
+            try:
+                pid = int(name[len(SLAB_PREFIX) :].split("-")[0])
+            except ValueError:
+                continue
+            if not _pid_alive(pid):
+                try:
+                    os.remove(os.path.join(root, name))
+                except FileNotFoundError:
+                    pass
+
+    def cleanup(self):
+        _remove_slabs(self.paths, self.owner)
+
+    def get_slab(self, slab_id):
+        # mapped lazily in each process (workers included)
+        if slab_id not in self._slabs:
+            slab = torch.from_file(
+                self.paths[slab_id], shared=True, size=self.slab_size, dtype=torch.uint8
+            )
+            if self.pin_memory and os.getpid() == self.owner:
+                torch.cuda.cudart().cudaHostRegister(slab.data_ptr(), self.slab_size, 0)
+            self._slabs[slab_id] = slab
+        return self._slabs[slab_id]
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_slabs"] = {}
+        state["_pending"] = []
+        # only the owner removes the slabs
+        state["_finalizer"] = None
+        return state
+
+    def acquire(self):
+        # return (generation, slab_id) of a free slab, or None
+        while True:
+            try:
+                generation, slab_id = self.free.get_nowait()
+            except queue.Empty:
+                return None
+            if generation == self.generation.value:
+                return generation, slab_id
+
+    def release(self, slab_id, generation):
+        if self.pin_memory:
+            event = torch.cuda.Event()
+            event.record()
+            self._pending.append((event, generation, slab_id))
+        else:
+            self.free.put((generation, slab_id))
+
+    def poll(self):
+        pending = []
+        for event, generation, slab_id in self._pending:
+            if event.query():
+                self.free.put((generation, slab_id))
+            else:
+                pending.append((event, generation, slab_id))
+        self._pending = pending
+
+    def invalidate(self):
+        """
+        Start a new generation without free slabs: ids in the queue or held by
+        batches in flight are dropped when they come back. Workers fall back to
+        point_collate_fn until reset().
+        """
+        for event, _, _ in self._pending:
+            # copies from a slab must finish before it is written again
+            event.synchronize()
+        self._pending = []
+        with self.generation.get_lock():
+            self.generation.value += 1
+
+    def reset(self):
+        # every slab free again, once no worker writes a slab of older generations
+        generation = self.generation.value
+        for slab_id in range(self.num_slabs):
+            self.free.put((generation, slab_id))
+
+    def pack(self, batch):
+        """
+        Collate a list of flat tensor dicts into a free slab, return a SlabBatch,
+        or None if no slab is free. Raise if the batch does not fit a slab.
+        """
+        layout, cursor = {}, 0
+        for key, elem in batch[0].items():
+            shape = [sum(data[key].shape[0] for data in batch)] + list(elem.shape[1:])
+            numel = 1
+            for size in shape:
+                numel *= size
+            cursor = _align(cursor)
+            layout[key] = (cursor, elem.dtype, shape)
+            cursor += numel * elem.element_size()
+        if cursor > self.slab_size:
+            raise ValueError(
+                f"Batch of {cursor / 1024 ** 2:.1f} MB exceeds the slab size of "
+                f"{self.slab_size / 1024 ** 2:.1f} MB, increase point_budget (or "
+                "headroom) of shm_transport."
+            )
+        free = self.acquire()
+        if free is None:
+            return None
+        generation, slab_id = free
+        slab = self.get_slab(slab_id)
+        for key, (offset, dtype, shape) in layout.items():
+            out = self.view(slab, offset, dtype, shape)
+            values = [data[key] for data in batch]
+            if "offset" in key:
+                torch.cumsum(torch.cat(values), dim=0, out=out)
+            else:
+                torch.cat(values, dim=0, out=out)
+        return SlabBatch(slab_id, generation, layout)
+
+    @staticmethod
+    def view(slab, offset, dtype, shape):
+        nbytes = torch.empty((), dtype=dtype).element_size()
+        for size in shape:
+            nbytes *= size
+        return slab[offset : offset + nbytes].view(dtype).view(shape)
+
+    def unpack(self, slab_batch):
+        slab = self.get_slab(slab_batch.slab_id)
+        batch = {
+            key: self.view(slab, offset, dtype, shape)
+            for key, (offset, dtype, shape) in slab_batch.layout.items()
+        }
+        if slab_batch.mix:
+            # Mix3d (https://arxiv.org/pdf/2110.02210.pdf)
+            batch["offset"] = torch.cat(
+                [batch["offset"][1:-1:2], batch["offset"][-1].unsqueeze(0)], dim=0
+            )
+        return batch
+
+    def serialize(self, slab_batch):
+        """
+        Merge (and re-sort for Mix3d) the serializations of a packed batch in
+        the slab, in the worker, so unpack only hands out views.
+        """
+        if "serial_order" not in slab_batch.layout:
+            return
+        slab = self.get_slab(slab_batch.slab_id)
+        batch = {
+            key: self.view(slab, offset, dtype, shape)
+            for key, (offset, dtype, shape) in slab_batch.layout.items()
+        }
+        merge_serialization(batch)
+        if slab_batch.mix:
+            batch["offset"] = torch.cat(
+                [batch["offset"][1:-1:2], batch["offset"][-1].unsqueeze(0)], dim=0
+            )
+            mix_serialization(batch)
+        # keys dropped by merge_serialization
+        slab_batch.layout = {
+            key: value for key, value in slab_batch.layout.items() if key in batch
+        }
+
+
+class SlabCollate(object):
+    """
+    Collate function running in DataLoader workers: flat tensor dict batches
+    (Collect outputs) are written into a slab of the ring, other batches or
+    batches without a free / large enough slab fall back to point_collate_fn.
+    """
+
+    def __init__(self, ring, mix_prob=0):
+        self.ring = ring
+        self.mix_prob = mix_prob
+        self.collate_fn = partial(point_collate_fn, mix_prob=mix_prob)
+
+    def __call__(self, batch):
+        if torch.utils.data.get_worker_info() is not None and is_flat_tensor_dict(
+            batch
+        ):
+            slab_batch = self.ring.pack(batch)
+            if slab_batch is not None:
+                slab_batch.mix = (
+                    "offset" in slab_batch.layout and random.random() < self.mix_prob
+                )
+                self.ring.serialize(slab_batch)
+                return slab_batch
+        return self.collate_fn(batch)
+
+
+class SlabLoader(object):
+    """
+    Wrap a DataLoader whose collate_fn is a SlabCollate, yield batches as views
+    into the slabs. The slab of a batch is recycled when the next batch is
+    requested, i.e. after the trainer finished the step using it. Each iteration
+    starts a new ring generation, so slabs of batches still in flight when an
+    iteration stopped early (break, evaluation, exception) are not lost.
+    """
+
+    def __init__(self, loader, ring):
+        self.loader = loader
+        self.ring = ring
+        self._iterator = None
+
+    def __getattr__(self, name):
+        # dataset, sampler, batch_sampler ... of the wrapped loader
+        if name in ("loader", "ring", "_iterator"):
+            raise AttributeError(name)
+        return getattr(self.loader, name)
+
+    def __len__(self):
+        return len(self.loader)
+
+    def __iter__(self):
+        previous, self._iterator = self._iterator, None
+        if previous is not None and not self.loader.persistent_workers:
+            # workers of an abandoned iteration must not write slabs any more
+            previous._shutdown_workers()
+        self.ring.invalidate()
+        # persistent workers finish (and the loader discards) the batches of
+        # the previous iteration before iter returns
+        iterator = iter(self.loader)
+        self._iterator = iterator
+        self.ring.reset()
+        held = None
+        try:
+            for batch in iterator:
+                if held is not None:
+                    self.ring.release(*held)
+                    held = None
+                self.ring.poll()
+                if isinstance(batch, SlabBatch):
+                    held = (batch.slab_id, batch.generation)
+                    batch = self.ring.unpack(batch)
+                yield batch
+        finally:
+            if held is not None:
+                self.ring.release(*held)
+
+
+def measure_bytes_per_point(dataset):
+    """
+    Bytes per point and per sample of the collected keys of dataset[0]: keys with
+    one row per point of the sample count per point, the others (offset,
+    serial_type ...) per sample.
+    """
+    if isinstance(dataset, SeededDataset):
+        dataset = dataset.dataset
+    sample = dataset[0]
+    assert (
+        isinstance(sample, dict) and "offset" in sample.keys()
+    ), "Slab transport needs Collect outputs with offset."
+    num_points = int(sample["offset"][-1])
+    per_point, per_sample = 0, 0
+    for key, value in sample.items():
+        nbytes = value.numel() * value.element_size() + ALIGNMENT
+        if key != "offset" and value.dim() > 0 and value.shape[0] == num_points:
+            per_point += value[0].numel() * value.element_size()
+            per_sample += ALIGNMENT
+        else:
+            per_sample += nbytes
+    return per_point, per_sample
+
+
+def build_slab_loader(
+    dataset,
+    batch_size=None,
+    num_workers=0,
+    point_budget=None,
+    headroom=1.5,
+    max_batch_size=None,
+    slab_size=None,
+    num_slabs=None,
+    mix_prob=0,
+    pin_memory=True,
+    prefetch_factor=2,
+    **kwargs,
+):
+    """
+    Build a DataLoader with the shared memory slab transport. Slabs hold
+    point_budget * headroom points (the point budget of a PointBudgetBatchSampler
+    if not given) of the bytes per point measured on the first sample, plus the
+    per-sample keys of batch_size (or max_batch_size, default 256) samples, unless
+    slab_size is given. num_slabs defaults to num_workers * prefetch_factor + 2,
+    enough for every batch in flight plus the one in use, so workers never wait
+    for a slab. A batch larger than a slab raises.
+    """
+    assert num_workers > 0, "Slab transport requires DataLoader workers."
+    if slab_size is None:
+        sampler = kwargs.get("batch_sampler", None)
+        while sampler is not None and point_budget is None:
+            # e.g. PointBudgetBatchSampler wrapped by ResumableBatchSampler
+            point_budget = getattr(sampler, "point_budget", None)
+            max_batch_size = max_batch_size or getattr(sampler, "max_batch_size", None)
+            sampler = getattr(sampler, "batch_sampler", None)
+        assert (
+            point_budget is not None
+        ), "Set point_budget (max points per batch) or slab_size in shm_transport."
+        per_point, per_sample = measure_bytes_per_point(dataset)
+        max_samples = batch_size or max_batch_size or 256
+        slab_size = int(point_budget * headroom) * per_point + max_samples * per_sample
+    num_slabs = num_slabs or num_workers * prefetch_factor + 2
+    ring = SlabRing(num_slabs, slab_size, pin_memory=pin_memory)
+    logger = get_root_logger()
+    logger.info(
+        f"Shared memory transport: {num_slabs} slabs x "
+        f"{slab_size / 1024 ** 2:.0f} MB in {ring.root}"
+    )
+    loader = torch.utils.data.DataLoader(
+        dataset,
+        batch_size=batch_size,
+        num_workers=num_workers,
+        collate_fn=SlabCollate(ring, mix_prob),
+        # slabs are pinned in place, the pin memory thread would copy them
+        pin_memory=False,
+        prefetch_factor=prefetch_factor,
+        **kwargs,
+    )
+    return SlabLoader(loader, ring)
@@ -36,24 +36,138 @@ def collate_fn(batch):
         for key in batch.keys():
             if "offset" in key:
                 batch[key] = torch.cumsum(batch[key], dim=0)
-        return batch
+        return merge_serialization(batch)
     else:
         return default_collate(batch)
 
 
+def concat_tensors(tensors):
+    """
+    Concatenate tensors along dim 0 into a single preallocated output. Inside
+    DataLoader workers the output lives in shared memory (as default_collate
+    does), so it is not copied again when sent to the main process.
+    """
+    elem = tensors[0]
+    shape = [sum(tensor.shape[0] for tensor in tensors)] + list(elem.shape[1:])
+    if torch.utils.data.get_worker_info() is not None:
+        numel = int(np.prod(shape))
+        try:
+            # typed storage since torch 2.0, untyped storage() before
+            if hasattr(elem, "_typed_storage"):
+                storage = elem._typed_storage()._new_shared(numel, device=elem.device)
+            else:
+                storage = elem.storage()._new_shared(numel)
+        except (AttributeError, RuntimeError, TypeError):
+            return torch.cat(tensors, dim=0)
+        out = elem.new(storage).resize_(shape)
+    else:
+        out = torch.empty(shape, dtype=elem.dtype, device=elem.device)
+    return torch.cat(tensors, dim=0, out=out)
+
+
+def fast_collate_fn(batch):
+    """
+    collate function for the flat dict of tensors produced by Collect, every
+    batched tensor is allocated once and samples are copied into it once,
+    'offset' keys are accumulated as in collate_fn.
+    """
+    collated = {}
+    for key in batch[0].keys():
+        values = [data[key] for data in batch]
+        if "offset" in key:
+            collated[key] = torch.cumsum(torch.cat(values), dim=0)
+        else:
+            collated[key] = concat_tensors(values)
+    return merge_serialization(collated)
+
+
+def merge_serialization(batch):
+    """
+    Merge the per-sample serializations of the Serialize transform into batched
+    ones: samples are consecutive and the batch index is the most significant
+    part of the code, so the per-sample sorted orders only need the sample start
+    added, no global sort. In place, batch has the accumulated offset. Dropped
+    if the samples were serialized with different orders or depths.
+    """
+    if "serial_order" not in batch.keys() or "offset" not in batch.keys():
+        return batch
+    offset = batch["offset"].long()
+    count = torch.diff(offset, prepend=offset.new_zeros(1))
+    serial_type = batch["serial_type"].view(len(count), -1)
+    depth = int(batch["serial_depth"][0])
+    if (serial_type != serial_type[0]).any() or (batch["serial_depth"] != depth).any():
+        drop_serialization(batch)
+        return batch
+    start = (offset - count).repeat_interleave(count).unsqueeze(-1)
+    index = torch.arange(len(count)).repeat_interleave(count).unsqueeze(-1)
+    batch["serial_code"] |= index << depth * 3
+    batch["serial_order"] += start
+    batch["serial_inverse"] += start
+    return batch
+
+
+def mix_serialization(batch):
+    """
+    Re-sort merged serializations after Mix3d merged the offsets: mixed samples
+    share a batch index, so their codes get the new index and one sort per order
+    replaces the encoding. In place.
+    """
+    if "serial_order" not in batch.keys():
+        return batch
+    offset = batch["offset"].long()
+    count = torch.diff(offset, prepend=offset.new_zeros(1))
+    depth = int(batch["serial_depth"][0])
+    index = torch.arange(len(count)).repeat_interleave(count).unsqueeze(-1)
+    code = batch["serial_code"]
+    code &= (1 << depth * 3) - 1
+    code |= index << depth * 3
+    order = torch.argsort(code, dim=0)
+    batch["serial_order"].copy_(order)
+    batch["serial_inverse"].scatter_(
+        dim=0,
+        index=order,
+        src=torch.arange(code.shape[0]).unsqueeze(-1).expand_as(order).contiguous(),
+    )
+    return batch
+
+
+def is_flat_tensor_dict(batch):
+    return all(
+        isinstance(value, torch.Tensor) and value.dim() > 0
+        for data in batch
+        for value in data.values()
+    )
+
+
 def point_collate_fn(batch, mix_prob=0):
     assert isinstance(
         batch[0], Mapping
     )  # currently, only support input_dict, rather than input_list
-    batch = collate_fn(batch)
+    if is_flat_tensor_dict(batch):
+        batch = fast_collate_fn(batch)
+    else:
+        batch = collate_fn(batch)
     if "offset" in batch.keys():
         # Mix3d (https://arxiv.org/pdf/2110.02210.pdf)
         if random.random() < mix_prob:
             batch["offset"] = torch.cat(
                 [batch["offset"][1:-1:2], batch["offset"][-1].unsqueeze(0)], dim=0
             )
+            mix_serialization(batch)
     return batch
 
 
+def drop_serialization(batch):
+    # serializations that cannot be merged, recomputed by the model
+    for key in [
+        "serial_code",
+        "serial_order",
+        "serial_inverse",
+        "serial_type",
+        "serial_depth",
+    ]:
+        batch.pop(key, None)
+
+
 def gaussian_kernel(dist2: np.array, a: float = 1, c: float = 5):
     return a * np.exp(-dist2 / (2 * c**2))
@@ -15,6 +15,8 @@ from .defaults import DefaultDataset
 
 @DATASETS.register_module()
 class WaymoDataset(DefaultDataset):
+    SCENE_PATTERN = "*/*"
+
     def __init__(
         self,
         timestamp=(0,),
@@ -36,6 +38,8 @@ class WaymoDataset(DefaultDataset):
         self.sequence_offset = np.append(self.sequence_offset, len(self.data_list))
 
     def get_data_list(self):
+        if self.packed or self.scene_manifest is not None:
+            return super().get_data_list()
         if isinstance(self.split, str):
             self.split = [self.split]
         data_list = []
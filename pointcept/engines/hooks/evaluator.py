@@ -12,6 +12,7 @@ import pointops
 from uuid import uuid4
 
 import pointcept.utils.comm as comm
+from pointcept.datasets import CUDAPrefetcher
 from pointcept.utils.misc import intersection_and_union_gpu
 
 from .default import HookBase
@@ -27,10 +28,7 @@ class ClsEvaluator(HookBase):
     def eval(self):
         self.trainer.logger.info(">>>>>>>>>>>>>>>> Start Evaluation >>>>>>>>>>>>>>>>")
         self.trainer.model.eval()
-        for i, input_dict in enumerate(self.trainer.val_loader):
-            for key in input_dict.keys():
-                if isinstance(input_dict[key], torch.Tensor):
-                    input_dict[key] = input_dict[key].cuda(non_blocking=True)
+        for i, input_dict in enumerate(CUDAPrefetcher(self.trainer.val_loader)):
             with torch.no_grad():
                 output_dict = self.trainer.model(input_dict)
             output = output_dict["cls_logits"]
@@ -111,10 +109,7 @@ class SemSegEvaluator(HookBase):
     def eval(self):
         self.trainer.logger.info(">>>>>>>>>>>>>>>> Start Evaluation >>>>>>>>>>>>>>>>")
         self.trainer.model.eval()
-        for i, input_dict in enumerate(self.trainer.val_loader):
-            for key in input_dict.keys():
-                if isinstance(input_dict[key], torch.Tensor):
-                    input_dict[key] = input_dict[key].cuda(non_blocking=True)
+        for i, input_dict in enumerate(CUDAPrefetcher(self.trainer.val_loader)):
             with torch.no_grad():
                 output_dict = self.trainer.model(input_dict)
             output = output_dict["seg_logits"]
@@ -507,13 +502,10 @@ class InsSegEvaluator(HookBase):
         self.trainer.logger.info(">>>>>>>>>>>>>>>> Start Evaluation >>>>>>>>>>>>>>>>")
         self.trainer.model.eval()
         scenes = []
-        for i, input_dict in enumerate(self.trainer.val_loader):
+        for i, input_dict in enumerate(CUDAPrefetcher(self.trainer.val_loader)):
             assert (
                 len(input_dict["offset"]) == 1
             )  # currently only support bs 1 for each GPU
-            for key in input_dict.keys():
-                if isinstance(input_dict[key], torch.Tensor):
-                    input_dict[key] = input_dict[key].cuda(non_blocking=True)
             with torch.no_grad():
                 output_dict = self.trainer.model(input_dict)
 
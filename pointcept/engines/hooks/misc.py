@@ -8,20 +8,24 @@ Please cite our work if the code is helpful to you.
 import sys
 import glob
 import os
+import json
+import atexit
 import shutil
 import time
 import torch
 import torch.utils.data
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 if sys.version_info >= (3, 10):
     from collections.abc import Sequence
 else:
     from collections import Sequence
 from pointcept.utils.timer import Timer
+from pointcept.utils.env import get_rng_state, set_rng_state
 from pointcept.utils.comm import is_main_process, synchronize, get_world_size
-from pointcept.utils.cache import shared_dict
 import pointcept.utils.comm as comm
+from pointcept.datasets import CUDAPrefetcher, ResumableBatchSampler
 from pointcept.engines.test import TESTERS
 
 from .default import HookBase
@@ -38,7 +42,10 @@ class IterationTimer(HookBase):
 
     def before_train(self):
         self._start_time = time.perf_counter()
-        self._remain_iter = self.trainer.max_epoch * len(self.trainer.train_loader)
+        self._remain_iter = (
+            self.trainer.max_epoch * len(self.trainer.train_loader)
+            - self.trainer.start_iter
+        )
 
     def before_epoch(self):
         self._iter_timer.reset()
@@ -82,7 +89,7 @@ class InformationWriter(HookBase):
 
     def before_train(self):
         self.trainer.comm_info["iter_info"] = ""
-        self.curr_iter = self.trainer.start_epoch * len(self.trainer.train_loader)
+        self.curr_iter = self.trainer.start_iter
 
     def before_step(self):
         self.curr_iter += 1
@@ -142,65 +149,156 @@ class InformationWriter(HookBase):
                 )
 
 
+def snapshot_to_cpu(state):
+    # copy of a (nested) state dict on cpu, safe to write while training goes on
+    if isinstance(state, torch.Tensor):
+        state = state.detach()
+        return state.clone() if state.device.type == "cpu" else state.cpu()
+    elif isinstance(state, dict):
+        return type(state)(
+            (key, snapshot_to_cpu(value)) for key, value in state.items()
+        )
+    elif isinstance(state, (list, tuple)):
+        return type(state)(snapshot_to_cpu(value) for value in state)
+    return state
+
+
+def link_checkpoint(src, dst):
+    # model_last is replaced (os.replace), never rewritten in place, so a hardlink
+    # keeps the snapshot; fall back to copying where hardlinks are not supported
+    tmp = dst + ".tmp"
+    if os.path.lexists(tmp):
+        os.remove(tmp)
+    try:
+        os.link(src, tmp)
+    except OSError:
+        shutil.copyfile(src, tmp)
+    os.replace(tmp, dst)
+
+
+def is_resumable(trainer):
+    # trainers whose loader can start an epoch at a given batch
+    batch_sampler = getattr(trainer.train_loader, "batch_sampler", None)
+    return isinstance(batch_sampler, ResumableBatchSampler)
+
+
 @HOOKS.register_module()
 class CheckpointSaver(HookBase):
-    def __init__(self, save_freq=None):
+    """
+    Save model_last every epoch (and every save_iter_freq iterations), link it to
+    model_best / epoch_{n} snapshots.
+
+    With async_save, state dicts are snapshotted to cpu memory and written by a
+    background thread, so training continues while the checkpoint is written.
+    At most one write is pending, after_train waits for it. max_keep bounds the
+    number of epoch_{n} snapshots kept (oldest removed first).
+    """
+
+    def __init__(
+        self, save_freq=None, save_iter_freq=None, async_save=False, max_keep=None
+    ):
         self.save_freq = save_freq  # None or int, None indicate only save model last
+        # None or int, also save model last every n iterations, only with
+        # IterationTrainer, which resumes mid-epoch at the next batch
+        self.save_iter_freq = save_iter_freq
+        self.async_save = async_save
+        self.max_keep = max_keep  # None or int, None indicate keep all snapshots
+        self.executor = ThreadPoolExecutor(max_workers=1) if async_save else None
+        self.pending = None
+
+    def before_train(self):
+        if self.save_iter_freq:
+            assert is_resumable(self.trainer), (
+                "save_iter_freq requires IterationTrainer, other trainers "
+                "replay the epoch from its first batch when resuming."
+            )
+
+    def after_step(self):
+        if not self.save_iter_freq:
+            return
+        iter_per_epoch = len(self.trainer.train_loader)
+        epoch_iter = self.trainer.comm_info["iter"] + 1
+        curr_iter = self.trainer.epoch * iter_per_epoch + epoch_iter
+        # the last iteration of an epoch is saved by after_epoch
+        if curr_iter % self.save_iter_freq == 0 and epoch_iter < iter_per_epoch:
+            self.save_checkpoint(self.trainer.epoch, curr_iter)
 
     def after_epoch(self):
-        if is_main_process():
-            is_best = False
-            if self.trainer.cfg.evaluate:
-                current_metric_value = self.trainer.comm_info["current_metric_value"]
-                current_metric_name = self.trainer.comm_info["current_metric_name"]
-                if current_metric_value > self.trainer.best_metric_value:
-                    self.trainer.best_metric_value = current_metric_value
-                    is_best = True
-                    self.trainer.logger.info(
-                        "Best validation {} updated to: {:.4f}".format(
-                            current_metric_name, current_metric_value
-                        )
-                    )
+        is_best = False
+        if is_main_process() and self.trainer.cfg.evaluate:
+            current_metric_value = self.trainer.comm_info["current_metric_value"]
+            current_metric_name = self.trainer.comm_info["current_metric_name"]
+            if current_metric_value > self.trainer.best_metric_value:
+                self.trainer.best_metric_value = current_metric_value
+                is_best = True
                 self.trainer.logger.info(
-                    "Currently Best {}: {:.4f}".format(
-                        current_metric_name, self.trainer.best_metric_value
+                    "Best validation {} updated to: {:.4f}".format(
+                        current_metric_name, current_metric_value
                     )
                 )
-
-            filename = os.path.join(
-                self.trainer.cfg.save_path, "model", "model_last.pth"
+            self.trainer.logger.info(
+                "Currently Best {}: {:.4f}".format(
+                    current_metric_name, self.trainer.best_metric_value
+                )
             )
-            self.trainer.logger.info("Saving checkpoint to: " + filename)
-            torch.save(
-                {
-                    "epoch": self.trainer.epoch + 1,
-                    "state_dict": self.trainer.model.state_dict(),
-                    "optimizer": self.trainer.optimizer.state_dict(),
-                    "scheduler": self.trainer.scheduler.state_dict(),
-                    "scaler": (
-                        self.trainer.scaler.state_dict()
-                        if self.trainer.cfg.enable_amp
-                        else None
-                    ),
-                    "best_metric_value": self.trainer.best_metric_value,
-                },
-                filename + ".tmp",
+        epoch = self.trainer.epoch + 1
+        links = []
+        if is_best:
+            links.append("model_best.pth")
+        if self.save_freq and epoch % self.save_freq == 0:
+            links.append(f"epoch_{epoch}.pth")
+        self.save_checkpoint(epoch, epoch * len(self.trainer.train_loader), links)
+
+    def after_train(self):
+        self.wait()
+
+    def wait(self):
+        if self.pending is not None:
+            # re-raise errors of the background write
+            self.pending.result()
+            self.pending = None
+
+    def save_checkpoint(self, epoch, curr_iter, links=()):
+        # rng states of every rank, gathered on all ranks
+        rng_state = comm.all_gather(get_rng_state())
+        if not is_main_process():
+            return
+        state = {
+            "epoch": epoch,
+            "iter": curr_iter,
+            "state_dict": self.trainer.model.state_dict(),
+            "optimizer": self.trainer.optimizer.state_dict(),
+            "scheduler": self.trainer.scheduler.state_dict(),
+            "scaler": (
+                self.trainer.scaler.state_dict()
+                if self.trainer.cfg.enable_amp
+                else None
+            ),
+            "best_metric_value": self.trainer.best_metric_value,
+            "rng_state": rng_state,
+        }
+        if self.async_save:
+            state = snapshot_to_cpu(state)
+            self.wait()
+            self.pending = self.executor.submit(self.write_checkpoint, state, links)
+        else:
+            self.write_checkpoint(state, links)
+
+    def write_checkpoint(self, state, links=()):
+        model_path = os.path.join(self.trainer.cfg.save_path, "model")
+        filename = os.path.join(model_path, "model_last.pth")
+        self.trainer.logger.info("Saving checkpoint to: " + filename)
+        torch.save(state, filename + ".tmp")
+        os.replace(filename + ".tmp", filename)
+        for link in links:
+            link_checkpoint(filename, os.path.join(model_path, link))
+        if self.max_keep:
+            snapshots = sorted(
+                glob.glob(os.path.join(model_path, "epoch_*.pth")),
+                key=lambda path: int(os.path.basename(path)[6:-4]),
             )
-            os.replace(filename + ".tmp", filename)
-            if is_best:
-                shutil.copyfile(
-                    filename,
-                    os.path.join(self.trainer.cfg.save_path, "model", "model_best.pth"),
-                )
-            if self.save_freq and (self.trainer.epoch + 1) % self.save_freq == 0:
-                shutil.copyfile(
-                    filename,
-                    os.path.join(
-                        self.trainer.cfg.save_path,
-                        "model",
-                        f"epoch_{self.trainer.epoch + 1}.pth",
-                    ),
-                )
+            for path in snapshots[: -self.max_keep]:
+                os.remove(path)
 
 
 @HOOKS.register_module()
@@ -237,15 +335,27 @@ class CheckpointLoader(HookBase):
             )
             self.trainer.logger.info(f"Missing keys: {load_state_info[0]}")
             if self.trainer.cfg.resume:
+                iter_per_epoch = len(self.trainer.train_loader)
+                start_iter = checkpoint.get(
+                    "iter", checkpoint["epoch"] * iter_per_epoch
+                )
+                assert start_iter % iter_per_epoch == 0 or is_resumable(
+                    self.trainer
+                ), "Resuming a mid-epoch checkpoint requires IterationTrainer."
                 self.trainer.logger.info(
-                    f"Resuming train at eval epoch: {checkpoint['epoch']}"
+                    f"Resuming train at eval epoch: {checkpoint['epoch']}, "
+                    f"iter: {start_iter % iter_per_epoch}"
                 )
                 self.trainer.start_epoch = checkpoint["epoch"]
+                self.trainer.start_iter = start_iter
                 self.trainer.best_metric_value = checkpoint["best_metric_value"]
                 self.trainer.optimizer.load_state_dict(checkpoint["optimizer"])
                 self.trainer.scheduler.load_state_dict(checkpoint["scheduler"])
                 if self.trainer.cfg.enable_amp:
                     self.trainer.scaler.load_state_dict(checkpoint["scaler"])
+                rng_state = checkpoint.get("rng_state")
+                if rng_state is not None and len(rng_state) == comm.get_world_size():
+                    set_rng_state(rng_state[comm.get_rank()])
         else:
             self.trainer.logger.info(f"No weight found at: {self.trainer.cfg.weight}")
 
@@ -279,37 +389,119 @@ class PreciseEvaluator(HookBase):
 
 @HOOKS.register_module()
 class DataCacheOperator(HookBase):
-    def __init__(self, data_root, split):
-        self.data_root = data_root
-        self.split = split
-        self.data_list = self.get_data_list()
-
-    def get_data_list(self):
-        if isinstance(self.split, str):
-            data_list = glob.glob(os.path.join(self.data_root, self.split))
-        elif isinstance(self.split, Sequence):
-            data_list = []
-            for split in self.split:
-                data_list += glob.glob(os.path.join(self.data_root, split))
-        else:
-            raise NotImplementedError
-        return data_list
+    """
+    Populate the shared memory cache of the train dataset (built with cache=True)
+    before training. Local ranks cache disjoint shards of the data list in
+    parallel, cached scenes are removed after training or on exit.
+    """
 
-    def get_cache_name(self, data_path):
-        data_name = data_path.replace(os.path.dirname(self.data_root), "")
-        return "pointcept" + data_name.replace(os.path.sep, "-")
+    def __init__(self, num_threads=8, cleanup=True):
+        self.num_threads = num_threads
+        self.cleanup = cleanup
+        self.cache = None
 
     def before_train(self):
+        dataset = self.trainer.train_loader.dataset
+        if getattr(dataset, "cache", None) is None:
+            self.trainer.logger.info("=> Dataset cache is disabled, skip caching.")
+            return
+        self.cache = dataset.cache
+        if self.cleanup and comm.get_local_rank() == 0:
+            atexit.register(self.cache.clear)
+        data_list = dataset.data_list[comm.get_local_rank() :: comm.get_local_size()]
         self.trainer.logger.info(
-            f"=> Caching dataset: {self.data_root}, split: {self.split} ..."
+            f"=> Caching {len(data_list)} / {len(dataset.data_list)} scenes "
+            f"on local rank {comm.get_local_rank()} ..."
         )
-        if is_main_process():
-            dataset = self.trainer.train_loader.dataset
-            for i in range(len(dataset)):
-                data_dict = dataset[i]
-                name = data_dict["name"]
-                shared_dict(f"Pointcept-{name}", data_dict)
+        with ThreadPoolExecutor(max_workers=self.num_threads) as pool:
+            list(pool.map(dataset.load_assets, data_list))
         synchronize()
+        self.trainer.logger.info(
+            f"=> Cached {self.cache.nbytes() / 1024 ** 3:.2f} GB in shared memory."
+        )
+
+    def after_train(self):
+        if self.cache is not None and self.cleanup:
+            synchronize()
+            if comm.get_local_rank() == 0:
+                self.cache.clear()
+
+
+@HOOKS.register_module()
+class TransformProfiler(HookBase):
+    """
+    Profile each transform of the train data pipeline. Compose records wall
+    time, input / output point counts and peak allocated bytes per sample in
+    DataLoader workers, records travel with the batch and are aggregated here,
+    written to the event storage and TensorBoard and summarized at epoch end.
+    """
+
+    METRICS = ("time", "points_in", "points_out", "allocated")
+
+    def __init__(self):
+        self.names = []
+
+    def before_train(self):
+        transforms = self.get_transforms(self.trainer.train_loader.dataset)
+        for transform in transforms:
+            # set before DataLoader workers are spawned, so they inherit it
+            transform.profile = True
+        self.trainer.logger.info(
+            f"=> Profiling {len(transforms)} train transform pipeline(s)."
+        )
+
+    @staticmethod
+    def get_transforms(dataset):
+        if hasattr(dataset, "datasets"):  # ConcatDataset
+            return [
+                transform
+                for sub_dataset in dataset.datasets
+                for transform in TransformProfiler.get_transforms(sub_dataset)
+            ]
+        transform = getattr(dataset, "transform", None)
+        return [transform] if hasattr(transform, "profile") else []
+
+    def before_step(self):
+        records = self.trainer.comm_info["input_dict"].pop("transform_profile", None)
+        if records is None:
+            return
+        for record in records:
+            for name, values in json.loads(record).items():
+                if name not in self.names:
+                    self.names.append(name)
+                for metric, value in zip(self.METRICS, values):
+                    self.trainer.storage.put_scalar(f"transform/{name}/{metric}", value)
+
+    def after_epoch(self):
+        if not self.names:
+            return
+        storage = self.trainer.storage
+        total = sum(storage.history(f"transform/{n}/time").total for n in self.names)
+        lines = [
+            "Transform profile (average per sample):",
+            f"{'Transform':<32}{'Time (ms)':>12}{'Share':>8}"
+            f"{'Points In':>12}{'Points Out':>12}{'Alloc (MB)':>12}",
+        ]
+        for name in self.names:
+            history = {
+                metric: storage.history(f"transform/{name}/{metric}")
+                for metric in self.METRICS
+            }
+            lines.append(
+                f"{name:<32}{history['time'].avg * 1000:>12.2f}"
+                f"{history['time'].total / max(total, 1e-12):>8.1%}"
+                f"{history['points_in'].avg:>12.0f}"
+                f"{history['points_out'].avg:>12.0f}"
+                f"{history['allocated'].avg / 1024 ** 2:>12.2f}"
+            )
+            if self.trainer.writer is not None:
+                for metric in self.METRICS:
+                    self.trainer.writer.add_scalar(
+                        f"transform/{name}/{metric}",
+                        history[metric].avg,
+                        self.trainer.epoch + 1,
+                    )
+        self.trainer.logger.info("\n".join(lines))
 
 
 @HOOKS.register_module()
@@ -334,12 +526,9 @@ class RuntimeProfiler(HookBase):
         self.trainer.logger.info("Profiling runtime ...")
         from torch.profiler import profile, record_function, ProfilerActivity
 
-        for i, input_dict in enumerate(self.trainer.train_loader):
+        for i, input_dict in enumerate(CUDAPrefetcher(self.trainer.train_loader)):
             if i == self.warm_up + 1:
                 break
-            for key in input_dict.keys():
-                if isinstance(input_dict[key], torch.Tensor):
-                    input_dict[key] = input_dict[key].cuda(non_blocking=True)
             if self.forward:
                 with profile(
                     activities=[ProfilerActivity.CPU, ProfilerActivity.CUDA],
@@ -435,12 +624,9 @@ class RuntimeProfilerV2(HookBase):
             with_stack=True,
         )
         prof.start()
-        for i, input_dict in enumerate(self.trainer.train_loader):
+        for i, input_dict in enumerate(CUDAPrefetcher(self.trainer.train_loader)):
             if i >= (self.wait + self.warmup + self.active) * self.repeat:
                 break
-            for key in input_dict.keys():
-                if isinstance(input_dict[key], torch.Tensor):
-                    input_dict[key] = input_dict[key].cuda(non_blocking=True)
             with record_function("model_forward"):
                 output_dict = self.trainer.model(input_dict)
                 loss = output_dict["loss"]
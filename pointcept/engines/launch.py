@@ -57,6 +57,9 @@ def launch(
         timeout (timedelta): timeout of the distributed workers
         args (tuple): arguments passed to main_func
     """
+    # node-local id of the run shared by all local ranks and their workers, scopes
+    # shared memory entries (e.g. SharedSceneCache) to this run
+    os.environ.setdefault("POINTCEPT_RUN_ID", str(os.getpid()))
     world_size = num_machines * num_gpus_per_machine
     if world_size > 1:
         if dist_url == "auto":
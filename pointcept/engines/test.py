@@ -6,6 +6,7 @@ Please cite our work if the code is helpful to you.
 """
 
 import os
+import glob
 import time
 import numpy as np
 from collections import OrderedDict
@@ -15,8 +16,16 @@ import torch.nn.functional as F
 import torch.utils.data
 
 from .defaults import create_ddp_model
+from .writer import PredictionWriter
 import pointcept.utils.comm as comm
-from pointcept.datasets import build_dataset, collate_fn
+from pointcept.datasets import (
+    build_dataset,
+    collate_fn,
+    CUDAPrefetcher,
+    FragmentStream,
+    SizeBalancedSampler,
+    to_cuda,
+)
 from pointcept.models import build_model
 from pointcept.utils.logger import get_root_logger
 from pointcept.utils.registry import Registry
@@ -55,6 +64,14 @@ class TesterBase:
         else:
             self.test_loader = test_loader
 
+    @property
+    def num_workers(self):
+        # each test worker holds a scene in flight, num_worker_test caps them
+        num_workers = self.cfg.get("num_worker_test", None)
+        if num_workers is None:
+            num_workers = self.cfg.get("num_worker_per_gpu", 1)
+        return num_workers
+
     def build_model(self):
         model = build_model(self.cfg.model)
         n_parameters = sum(p.numel() for p in model.parameters() if p.requires_grad)
@@ -89,14 +106,16 @@ class TesterBase:
     def build_test_loader(self):
         test_dataset = build_dataset(self.cfg.data.test)
         if comm.get_world_size() > 1:
-            test_sampler = torch.utils.data.distributed.DistributedSampler(test_dataset)
+            test_sampler = SizeBalancedSampler(
+                test_dataset, num_replicas=comm.get_world_size(), rank=comm.get_rank()
+            )
         else:
             test_sampler = None
         test_loader = torch.utils.data.DataLoader(
             test_dataset,
             batch_size=self.cfg.batch_size_test_per_gpu,
             shuffle=False,
-            num_workers=self.cfg.batch_size_test_per_gpu,
+            num_workers=self.num_workers,
             pin_memory=True,
             sampler=test_sampler,
             collate_fn=self.__class__.collate_fn,
@@ -113,8 +132,47 @@ class TesterBase:
 
 @TESTERS.register_module()
 class SemSegTester(TesterBase):
+    def build_test_loader(self):
+        test_dataset = build_dataset(self.cfg.data.test)
+        if comm.get_world_size() > 1:
+            indices = SizeBalancedSampler(
+                test_dataset, num_replicas=comm.get_world_size(), rank=comm.get_rank()
+            ).indices
+        else:
+            indices = range(len(test_dataset))
+        # scenes predicted by a previous run only need their labels
+        save_path = os.path.join(self.cfg.save_path, "result")
+        skip = []
+        if hasattr(test_dataset, "get_data_name"):
+            skip = [
+                idx
+                for idx in indices
+                if os.path.isfile(
+                    os.path.join(
+                        save_path, "{}_pred.npy".format(test_dataset.get_data_name(idx))
+                    )
+                )
+            ]
+        num_workers = self.num_workers
+        # bounded queue of fragment batches ahead of inference, prefetch_factor
+        # is only accepted with workers on torch < 2.0
+        loader_kwargs = dict(prefetch_factor=2) if num_workers > 0 else dict()
+        test_loader = torch.utils.data.DataLoader(
+            FragmentStream(
+                test_dataset,
+                indices,
+                point_budget=self.cfg.get("fragment_point_budget", None),
+                skip=skip,
+            ),
+            batch_size=None,
+            num_workers=num_workers,
+            pin_memory=True,
+            collate_fn=self.__class__.collate_fn,
+            **loader_kwargs,
+        )
+        return test_loader
+
     def test(self):
-        assert self.test_loader.batch_size == 1
         logger = get_root_logger()
         logger.info(">>>>>>>>>>>>>>>> Start Evaluation >>>>>>>>>>>>>>>>")
 
@@ -155,56 +213,93 @@ class SemSegTester(TesterBase):
                 os.path.join(save_path, "submit", "test", "submission.json"), "w"
             ) as f:
                 json.dump(submission, f, indent=4)
+        las_root = self.cfg.get("las_root", None)
+        if las_root is not None:
+            make_dirs(os.path.join(save_path, "las"))
         comm.synchronize()
+        # predictions and submission files are written in the background
+        writer = PredictionWriter(
+            self.cfg.data.num_classes, num_threads=self.cfg.get("writer_threads", 4)
+        )
+        topk = self.cfg.get("pred_topk", 0)
+        cuda_scenes = self.cfg.get("test_cuda_scenes", 2)
         record = {}
-        # fragment inference
-        for idx, data_dict in enumerate(self.test_loader):
-            end = time.time()
-            data_dict = data_dict[0]  # current assume batch size is 1
-            fragment_list = data_dict.pop("fragment_list")
+        scenes = {}
+        num_scenes = self.test_loader.dataset.num_scenes
+        idx = -1
+        # fragment inference, fragments are streamed from the loader workers
+        for item in CUDAPrefetcher(self.test_loader):
+            if "header" in item:
+                data_dict = item["header"]
+                pred = None
+                if not item["skip"]:
+                    # scenes of all loader workers are open at once, bound the
+                    # (n, k) accumulators kept on the GPU
+                    on_cuda = (
+                        sum(
+                            s["pred"] is not None and s["pred"].is_cuda
+                            for s in scenes.values()
+                        )
+                        < cuda_scenes
+                    )
+                    pred = torch.zeros(
+                        (data_dict["segment"].size, self.cfg.data.num_classes),
+                        device="cuda" if on_cuda else "cpu",
+                    )
+                scenes[item["scene"]] = dict(
+                    data_dict=data_dict, pred=pred, num_batches=0, end=time.time()
+                )
+                continue
+            scene = scenes[item["scene"]]
+            if "batch" in item:
+                input_dict = item["batch"]
+                idx_part = input_dict["index"]
+                with torch.no_grad():
+                    pred_part = self.model(input_dict)["seg_logits"]  # (n, k)
+                    pred_part = F.softmax(pred_part, -1)
+                    if self.cfg.empty_cache:
+                        torch.cuda.empty_cache()
+                    # index is unique within a fragment, accumulate across
+                    device = scene["pred"].device
+                    scene["pred"].index_add_(
+                        0, idx_part.to(device), pred_part.to(device)
+                    )
+                logger.info(
+                    "Test: {}/{}-{data_name}, Batch: {batch_idx}".format(
+                        item["scene"] + 1,
+                        num_scenes,
+                        data_name=scene["data_dict"]["name"],
+                        batch_idx=scene["num_batches"],
+                    )
+                )
+                scene["num_batches"] += 1
+                continue
+
+            # all fragments of the scene are inferred
+            scenes.pop(item["scene"])
+            idx += 1
+            end = scene["end"]
+            data_dict = scene["data_dict"]
             segment = data_dict.pop("segment")
             data_name = data_dict.pop("name")
             pred_save_path = os.path.join(save_path, "{}_pred.npy".format(data_name))
-            if os.path.isfile(pred_save_path):
+            if scene["pred"] is None:
                 logger.info(
                     "{}/{}: {}, loaded pred and label.".format(
-                        idx + 1, len(self.test_loader), data_name
+                        idx + 1, num_scenes, data_name
                     )
                 )
-                pred = np.load(pred_save_path)
+                pred = np.load(pred_save_path).astype(np.int64)
                 if "origin_segment" in data_dict.keys():
                     segment = data_dict["origin_segment"]
             else:
-                pred = torch.zeros((segment.size, self.cfg.data.num_classes)).cuda()
-                for i in range(len(fragment_list)):
-                    fragment_batch_size = 1
-                    s_i, e_i = i * fragment_batch_size, min(
-                        (i + 1) * fragment_batch_size, len(fragment_list)
-                    )
-                    input_dict = collate_fn(fragment_list[s_i:e_i])
-                    for key in input_dict.keys():
-                        if isinstance(input_dict[key], torch.Tensor):
-                            input_dict[key] = input_dict[key].cuda(non_blocking=True)
-                    idx_part = input_dict["index"]
-                    with torch.no_grad():
-                        pred_part = self.model(input_dict)["seg_logits"]  # (n, k)
-                        pred_part = F.softmax(pred_part, -1)
-                        if self.cfg.empty_cache:
-                            torch.cuda.empty_cache()
-                        bs = 0
-                        for be in input_dict["offset"]:
-                            pred[idx_part[bs:be], :] += pred_part[bs:be]
-                            bs = be
-
-                    logger.info(
-                        "Test: {}/{}-{data_name}, Batch: {batch_idx}/{batch_num}".format(
-                            idx + 1,
-                            len(self.test_loader),
-                            data_name=data_name,
-                            batch_idx=i,
-                            batch_num=len(fragment_list),
-                        )
-                    )
+                pred = scene["pred"]
+                if topk > 0:
+                    # accumulated probabilities over all fragments, normalized
+                    prob = pred / pred.sum(1, keepdim=True).clamp(min=1e-10)
+                    topk_value, topk_index = prob.topk(topk, dim=1)
+                    topk_value = topk_value.half().cpu().numpy()
+                    topk_index = topk_index.cpu().numpy()
                 if self.cfg.data.test.type == "ScanNetPPDataset":
                     pred = pred.topk(3, dim=1)[1].data.cpu().numpy()
                 else:
@@ -212,23 +307,39 @@ class SemSegTester(TesterBase):
                 if "origin_segment" in data_dict.keys():
                     assert "inverse" in data_dict.keys()
                     pred = pred[data_dict["inverse"]]
+                    if topk > 0:
+                        topk_value = topk_value[data_dict["inverse"]]
+                        topk_index = topk_index[data_dict["inverse"]]
                     segment = data_dict["origin_segment"]
-                np.save(pred_save_path, pred)
+                writer.save_pred(pred_save_path, pred)
+                if topk > 0:
+                    writer.save_topk(
+                        os.path.join(save_path, "{}_topk.npz".format(data_name)),
+                        topk_value,
+                        topk_index,
+                    )
+            if las_root is not None:
+                las_path = glob.glob(
+                    os.path.join(las_root, "{}.[lL][aA][sSzZ]".format(data_name))
+                )
+                assert len(las_path) == 1, f"No LAS tile for {data_name} in {las_root}"
+                writer.save_las(
+                    las_path[0],
+                    os.path.join(save_path, "las", os.path.basename(las_path[0])),
+                    pred if pred.ndim == 1 else pred[:, 0],
+                )
             if (
                 self.cfg.data.test.type == "ScanNetDataset"
                 or self.cfg.data.test.type == "ScanNet200Dataset"
             ):
-                np.savetxt(
+                writer.save_scannet(
                     os.path.join(save_path, "submit", "{}.txt".format(data_name)),
-                    self.test_loader.dataset.class2id[pred].reshape([-1, 1]),
-                    fmt="%d",
+                    self.test_loader.dataset.class2id[pred],
                 )
             elif self.cfg.data.test.type == "ScanNetPPDataset":
-                np.savetxt(
+                writer.save_scannetpp(
                     os.path.join(save_path, "submit", "{}.txt".format(data_name)),
-                    pred.astype(np.int32),
-                    delimiter=",",
-                    fmt="%d",
+                    pred,
                 )
                 pred = pred[:, 0]  # for mIoU, TODO: support top3 mIoU
             elif self.cfg.data.test.type == "SemanticKITTIDataset":
@@ -240,11 +351,7 @@ class SemSegTester(TesterBase):
                     ),
                     exist_ok=True,
                 )
-                submit = pred.astype(np.uint32)
-                submit = np.vectorize(
-                    self.test_loader.dataset.learning_map_inv.__getitem__
-                )(submit).astype(np.uint32)
-                submit.tofile(
+                writer.save_semantic_kitti(
                     os.path.join(
                         save_path,
                         "submit",
@@ -252,17 +359,20 @@ class SemSegTester(TesterBase):
                         sequence_name,
                         "predictions",
                         f"{frame_name}.label",
-                    )
+                    ),
+                    pred,
+                    self.test_loader.dataset.learning_map_inv,
                 )
             elif self.cfg.data.test.type == "NuScenesDataset":
-                np.array(pred + 1).astype(np.uint8).tofile(
+                writer.save_nuscenes(
                     os.path.join(
                         save_path,
                         "submit",
                         "lidarseg",
                         "test",
                         "{}_lidarseg.bin".format(data_name),
-                    )
+                    ),
+                    pred,
                 )
 
             intersection, union, target = intersection_and_union(
@@ -291,7 +401,7 @@ class SemSegTester(TesterBase):
                 "mIoU {iou:.4f} ({m_iou:.4f})".format(
                     data_name,
                     idx + 1,
-                    len(self.test_loader),
+                    num_scenes,
                     segment.size,
                     batch_time=batch_time,
                     acc=acc,
@@ -301,6 +411,7 @@ class SemSegTester(TesterBase):
                 )
             )
 
+        writer.wait()
         logger.info("Syncing ...")
         comm.synchronize()
         record_sync = comm.gather(record, dst=0)
@@ -361,10 +472,7 @@ class ClsTester(TesterBase):
         target_meter = AverageMeter()
         self.model.eval()
 
-        for i, input_dict in enumerate(self.test_loader):
-            for key in input_dict.keys():
-                if isinstance(input_dict[key], torch.Tensor):
-                    input_dict[key] = input_dict[key].cuda(non_blocking=True)
+        for i, input_dict in enumerate(CUDAPrefetcher(self.test_loader)):
             end = time.time()
             with torch.no_grad():
                 output_dict = self.model(input_dict)
@@ -374,10 +482,6 @@ class ClsTester(TesterBase):
             intersection, union, target = intersection_and_union_gpu(
                 pred, label, self.cfg.data.num_classes, self.cfg.data.ignore_index
             )
-            if comm.get_world_size() > 1:
-                dist.all_reduce(intersection), dist.all_reduce(union), dist.all_reduce(
-                    target
-                )
             intersection, union, target = (
                 intersection.cpu().numpy(),
                 union.cpu().numpy(),
@@ -401,11 +505,22 @@ class ClsTester(TesterBase):
                 )
             )
 
-        iou_class = intersection_meter.sum / (union_meter.sum + 1e-10)
-        accuracy_class = intersection_meter.sum / (target_meter.sum + 1e-10)
+        # reduce once, ranks may test a different number of batches
+        meters = np.stack(
+            [
+                np.broadcast_to(meter.sum, self.cfg.data.num_classes)
+                for meter in (intersection_meter, union_meter, target_meter)
+            ]
+        )
+        meters = torch.from_numpy(meters).cuda()
+        if comm.get_world_size() > 1:
+            dist.all_reduce(meters)
+        intersection, union, target = meters.cpu().numpy()
+        iou_class = intersection / (union + 1e-10)
+        accuracy_class = intersection / (target + 1e-10)
         mIoU = np.mean(iou_class)
         mAcc = np.mean(accuracy_class)
-        allAcc = sum(intersection_meter.sum) / (sum(target_meter.sum) + 1e-10)
+        allAcc = sum(intersection) / (sum(target) + 1e-10)
         logger.info(
             "Val result: mIoU/mAcc/allAcc {:.4f}/{:.4f}/{:.4f}.".format(
                 mIoU, mAcc, allAcc
@@ -480,10 +595,7 @@ class ClsVotingTester(TesterBase):
             #             input_dict[key] = input_dict[key].cuda(non_blocking=True)
             #     with torch.no_grad():
             #         pred += F.softmax(self.model(input_dict)["cls_logits"], -1)
-            input_dict = collate_fn(voting_list)
-            for key in input_dict.keys():
-                if isinstance(input_dict[key], torch.Tensor):
-                    input_dict[key] = input_dict[key].cuda(non_blocking=True)
+            input_dict = to_cuda(collate_fn(voting_list))
             with torch.no_grad():
                 pred = F.softmax(self.model(input_dict)["cls_logits"], -1).sum(
                     0, keepdim=True
@@ -570,14 +682,11 @@ class PartSegTester(TesterBase):
             data_dict_list, label = test_dataset[idx]
             pred = torch.zeros((label.size, self.cfg.data.num_classes)).cuda()
             batch_num = int(np.ceil(len(data_dict_list) / self.cfg.batch_size_test))
-            for i in range(batch_num):
-                s_i, e_i = i * self.cfg.batch_size_test, min(
-                    (i + 1) * self.cfg.batch_size_test, len(data_dict_list)
-                )
-                input_dict = collate_fn(data_dict_list[s_i:e_i])
-                for key in input_dict.keys():
-                    if isinstance(input_dict[key], torch.Tensor):
-                        input_dict[key] = input_dict[key].cuda(non_blocking=True)
+            batch_loader = (
+                collate_fn(data_dict_list[s_i : s_i + self.cfg.batch_size_test])
+                for s_i in range(0, len(data_dict_list), self.cfg.batch_size_test)
+            )
+            for i, input_dict in enumerate(CUDAPrefetcher(batch_loader)):
                 with torch.no_grad():
                     pred_part = self.model(input_dict)["cls_logits"]
                     pred_part = F.softmax(pred_part, -1)
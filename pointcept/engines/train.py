@@ -22,7 +22,16 @@ from tensorboardX import SummaryWriter
 from .defaults import create_ddp_model, worker_init_fn
 from .hooks import HookBase, build_hooks
 import pointcept.utils.comm as comm
-from pointcept.datasets import build_dataset, point_collate_fn, collate_fn
+from pointcept.datasets import (
+    build_dataset,
+    build_sampler,
+    build_slab_loader,
+    CUDAPrefetcher,
+    ResumableBatchSampler,
+    SeededDataset,
+    point_collate_fn,
+    collate_fn,
+)
 from pointcept.models import build_model
 from pointcept.utils.logger import get_root_logger
 from pointcept.utils.optimizer import build_optimizer
@@ -30,7 +39,6 @@ from pointcept.utils.scheduler import build_scheduler
 from pointcept.utils.events import EventStorage, ExceptionWriter
 from pointcept.utils.registry import Registry
 
-
 TRAINERS = Registry("trainers")
 
 
@@ -40,6 +48,7 @@ class TrainerBase:
         self.epoch = 0
         self.start_epoch = 0
         self.max_epoch = 0
+        self.start_iter = 0
         self.max_iter = 0
         self.comm_info = dict()
         self.data_iterator: Iterator = enumerate([])
@@ -152,10 +161,13 @@ class Trainer(TrainerBase):
             for self.epoch in range(self.start_epoch, self.max_epoch):
                 # => before epoch
                 # TODO: optimize to iteration based
-                if comm.get_world_size() > 1:
+                batch_sampler = getattr(self.train_loader, "batch_sampler", None)
+                if hasattr(batch_sampler, "set_epoch"):
+                    batch_sampler.set_epoch(self.epoch)
+                elif comm.get_world_size() > 1:
                     self.train_loader.sampler.set_epoch(self.epoch)
                 self.model.train()
-                self.data_iterator = enumerate(self.train_loader)
+                self.data_iterator = enumerate(CUDAPrefetcher(self.train_loader))
                 self.before_epoch()
                 # => run_epoch
                 for (
@@ -175,9 +187,6 @@ class Trainer(TrainerBase):
 
     def run_step(self):
         input_dict = self.comm_info["input_dict"]
-        for key in input_dict.keys():
-            if isinstance(input_dict[key], torch.Tensor):
-                input_dict[key] = input_dict[key].cuda(non_blocking=True)
         with torch.cuda.amp.autocast(enabled=self.cfg.enable_amp):
             output_dict = self.model(input_dict)
             loss = output_dict["loss"]
@@ -229,6 +238,9 @@ class Trainer(TrainerBase):
     def build_train_loader(self):
         train_data = build_dataset(self.cfg.data.train)
 
+        if self.cfg.get("train_sampler", None) is not None:
+            return self.build_batch_sampler_loader(train_data)
+
         if comm.get_world_size() > 1:
             train_sampler = torch.utils.data.distributed.DistributedSampler(train_data)
         else:
@@ -245,6 +257,20 @@ class Trainer(TrainerBase):
             else None
         )
 
+        if self.cfg.get("shm_transport", None) is not None:
+            return build_slab_loader(
+                train_data,
+                batch_size=self.cfg.batch_size_per_gpu,
+                num_workers=self.cfg.num_worker_per_gpu,
+                mix_prob=self.cfg.mix_prob,
+                shuffle=(train_sampler is None),
+                sampler=train_sampler,
+                worker_init_fn=init_fn,
+                drop_last=True,
+                persistent_workers=True,
+                **self.cfg.shm_transport,
+            )
+
         train_loader = torch.utils.data.DataLoader(
             train_data,
             batch_size=self.cfg.batch_size_per_gpu,
@@ -259,6 +285,51 @@ class Trainer(TrainerBase):
         )
         return train_loader
 
+    def build_batch_sampler(self, train_data):
+        # batch composition decided by a registered batch sampler, e.g.
+        # train_sampler = dict(type="PointBudgetBatchSampler", point_budget=1000000)
+        return build_sampler(
+            self.cfg.train_sampler,
+            dataset=train_data,
+            num_replicas=comm.get_world_size(),
+            rank=comm.get_rank(),
+            seed=self.cfg.seed,
+        )
+
+    def build_batch_sampler_loader(self, train_data, batch_sampler=None):
+        if batch_sampler is None:
+            batch_sampler = self.build_batch_sampler(train_data)
+        init_fn = (
+            partial(
+                worker_init_fn,
+                num_workers=self.cfg.num_worker_per_gpu,
+                rank=comm.get_rank(),
+                seed=self.cfg.seed,
+            )
+            if self.cfg.seed is not None
+            else None
+        )
+        if self.cfg.get("shm_transport", None) is not None:
+            return build_slab_loader(
+                train_data,
+                batch_sampler=batch_sampler,
+                num_workers=self.cfg.num_worker_per_gpu,
+                mix_prob=self.cfg.mix_prob,
+                worker_init_fn=init_fn,
+                persistent_workers=True,
+                **self.cfg.shm_transport,
+            )
+        train_loader = torch.utils.data.DataLoader(
+            train_data,
+            batch_sampler=batch_sampler,
+            num_workers=self.cfg.num_worker_per_gpu,
+            collate_fn=partial(point_collate_fn, mix_prob=self.cfg.mix_prob),
+            pin_memory=True,
+            worker_init_fn=init_fn,
+            persistent_workers=True,
+        )
+        return train_loader
+
     def build_val_loader(self):
         val_loader = None
         if self.cfg.evaluate:
@@ -292,6 +363,71 @@ class Trainer(TrainerBase):
         return scaler
 
 
+@TRAINERS.register_module("IterationTrainer")
+class IterationTrainer(Trainer):
+    """
+    Trainer driven by a global iteration counter. Batches come from a
+    ResumableBatchSampler and every sample is seeded by its position, so a
+    checkpoint saved mid-epoch (CheckpointSaver with save_iter_freq) resumes at
+    the next batch with the same data order and augmentations, without replaying
+    the batches already trained on.
+    """
+
+    def train(self):
+        with EventStorage() as self.storage, ExceptionWriter():
+            # => before train
+            self.before_train()
+            self.logger.info(">>>>>>>>>>>>>>>> Start Training >>>>>>>>>>>>>>>>")
+            iter_per_epoch = len(self.train_loader)
+            self.max_iter = self.max_epoch * iter_per_epoch
+            batch_sampler = self.train_loader.batch_sampler
+            for self.epoch in range(self.start_iter // iter_per_epoch, self.max_epoch):
+                # => before epoch
+                start = max(self.start_iter - self.epoch * iter_per_epoch, 0)
+                batch_sampler.set_epoch(self.epoch)
+                batch_sampler.set_start(start)
+                self.model.train()
+                self.data_iterator = enumerate(
+                    CUDAPrefetcher(self.train_loader), start=start
+                )
+                self.before_epoch()
+                # => run_epoch
+                for (
+                    self.comm_info["iter"],
+                    self.comm_info["input_dict"],
+                ) in self.data_iterator:
+                    # => before_step
+                    self.before_step()
+                    # => run_step
+                    self.run_step()
+                    # => after_step
+                    self.after_step()
+                # => after epoch
+                self.after_epoch()
+            # => after train
+            self.after_train()
+
+    def build_train_loader(self):
+        train_data = build_dataset(self.cfg.data.train)
+        if self.cfg.get("train_sampler", None) is not None:
+            batch_sampler = self.build_batch_sampler(train_data)
+        else:
+            # seeded order per epoch, also on a single gpu
+            sampler = torch.utils.data.distributed.DistributedSampler(
+                train_data,
+                num_replicas=comm.get_world_size(),
+                rank=comm.get_rank(),
+                seed=self.cfg.seed,
+            )
+            batch_sampler = torch.utils.data.BatchSampler(
+                sampler, self.cfg.batch_size_per_gpu, drop_last=True
+            )
+        batch_sampler = ResumableBatchSampler(
+            batch_sampler, seed=self.cfg.seed, rank=comm.get_rank()
+        )
+        return self.build_batch_sampler_loader(SeededDataset(train_data), batch_sampler)
+
+
 @TRAINERS.register_module("MultiDatasetTrainer")
 class MultiDatasetTrainer(Trainer):
     def build_train_loader(self):
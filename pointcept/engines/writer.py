@@ -0,0 +1,147 @@
+"""
+Prediction Writer
+
+Write test predictions and submission files on a background thread pool, so
+that inference does not wait for the disk. Labels are stored as uint8 / uint16,
+optional top-k probabilities as float16.
+"""
+
+import os
+import time
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import laspy
+except ImportError:
+    laspy = None
+
+from pointcept.utils.logger import get_root_logger
+
+
+def label_dtype(num_classes):
+    return np.uint8 if num_classes <= np.iinfo(np.uint8).max + 1 else np.uint16
+
+
+def build_lut(mapping, dtype=np.uint32):
+    # dict label -> label as a lookup table, negative keys (ignore index) dropped
+    keys = [key for key in mapping.keys() if key >= 0]
+    lut = np.zeros(max(keys) + 1, dtype=dtype)
+    for key in keys:
+        lut[key] = mapping[key]
+    return lut
+
+
+class PredictionWriter(object):
+    """
+    Queue prediction writes on num_threads background threads. save_* methods
+    only enqueue, arrays passed in must not be modified afterwards. wait()
+    blocks until everything is written, re-raises write errors and logs the
+    write throughput.
+    """
+
+    def __init__(self, num_classes, num_threads=4):
+        self.dtype = label_dtype(num_classes)
+        self.executor = ThreadPoolExecutor(max_workers=num_threads)
+        self.futures = []
+        self.lock = threading.Lock()
+        self.num_files = 0
+        self.num_bytes = 0
+        self.write_time = 0
+        self.start_time = time.perf_counter()
+
+    def submit(self, func, *args):
+        self.futures.append(self.executor.submit(self.timed, func, *args))
+
+    def timed(self, func, *args):
+        start = time.perf_counter()
+        path = func(*args)
+        elapsed = time.perf_counter() - start
+        with self.lock:
+            self.num_files += 1
+            self.num_bytes += os.path.getsize(path)
+            self.write_time += elapsed
+
+    def wait(self):
+        for future in self.futures:
+            future.result()
+        self.futures = []
+        elapsed = time.perf_counter() - self.start_time
+        logger = get_root_logger()
+        logger.info(
+            f"Prediction writer: {self.num_files} files, "
+            f"{self.num_bytes / 1024 ** 2:.1f} MB, "
+            f"{self.num_bytes / 1024 ** 2 / max(self.write_time, 1e-12):.1f} MB/s "
+            f"per thread, {self.write_time:.1f}s writing in {elapsed:.1f}s."
+        )
+
+    def save_pred(self, path, pred):
+        self.submit(self.write_npy, path, pred.astype(self.dtype, copy=False))
+
+    def save_topk(self, path, value, index):
+        self.submit(
+            self.write_npz,
+            path,
+            dict(
+                value=value.astype(np.float16, copy=False),
+                index=index.astype(self.dtype, copy=False),
+            ),
+        )
+
+    def save_scannet(self, path, pred):
+        self.submit(self.write_txt, path, pred)
+
+    def save_scannetpp(self, path, pred):
+        self.submit(self.write_csv, path, pred)
+
+    def save_semantic_kitti(self, path, pred, learning_map_inv):
+        self.submit(self.write_bin, path, build_lut(learning_map_inv)[pred])
+
+    def save_nuscenes(self, path, pred):
+        self.submit(self.write_bin, path, (pred + 1).astype(np.uint8))
+
+    def save_las(self, src_path, path, pred):
+        assert laspy is not None, "Please install laspy to export LAS predictions."
+        self.submit(self.write_las, src_path, path, pred.astype(self.dtype))
+
+    @staticmethod
+    def write_npy(path, array):
+        # written aside and renamed, a partial file is never taken as a prediction
+        with open(path + ".tmp", "wb") as f:
+            np.save(f, array)
+        os.replace(path + ".tmp", path)
+        return path
+
+    @staticmethod
+    def write_npz(path, arrays):
+        np.savez(path, **arrays)
+        return path
+
+    @staticmethod
+    def write_bin(path, array):
+        array.tofile(path)
+        return path
+
+    @staticmethod
+    def write_txt(path, array):
+        # one label per line, as np.savetxt(fmt="%d") but in a single C loop
+        with open(path, "w") as f:
+            array.reshape(-1).astype(np.int64).tofile(f, sep="\n", format="%d")
+            f.write("\n")
+        return path
+
+    @staticmethod
+    def write_csv(path, array):
+        np.savetxt(path, array.astype(np.int32), delimiter=",", fmt="%d")
+        return path
+
+    @staticmethod
+    def write_las(src_path, path, pred):
+        # original tile with the prediction as an extra dimension
+        las = laspy.read(src_path)
+        assert len(las.points) == pred.shape[0], "Prediction does not match tile."
+        las.add_extra_dim(laspy.ExtraBytesParams(name="prediction", type=pred.dtype))
+        las.prediction = pred
+        las.write(path)
+        return path
@@ -61,6 +61,8 @@ class SerializedAttention(PointModule):
         order_index=0,
         enable_rpe=False,
         enable_flash=True,
+        enable_sdpa=False,
+        attn_chunk_size=1024,
         upcast_attention=True,
         upcast_softmax=True,
     ):
@@ -74,7 +76,12 @@ class SerializedAttention(PointModule):
         self.upcast_softmax = upcast_softmax
         self.enable_rpe = enable_rpe
         self.enable_flash = enable_flash
+        self.enable_sdpa = enable_sdpa
+        self.attn_chunk_size = attn_chunk_size
         if enable_flash:
+            assert (
+                enable_sdpa is False
+            ), "Set enable_sdpa to False when enable Flash Attention"
             assert (
                 enable_rpe is False
             ), "Set enable_rpe to False when enable Flash Attention"
@@ -87,6 +94,14 @@ class SerializedAttention(PointModule):
             assert flash_attn is not None, "Make sure flash_attn is installed."
             self.patch_size = patch_size
             self.attn_drop = attn_drop
+        elif enable_sdpa:
+            assert hasattr(
+                torch.nn.functional, "scaled_dot_product_attention"
+            ), "enable_sdpa requires torch >= 2.0."
+            # patches keep the configured size, samples with fewer points
+            # than patch_size form one short patch, masked to full size
+            self.patch_size = patch_size
+            self.attn_drop = attn_drop
         else:
             # when disable flash attention, we still don't want to use mask
             # consequently, patch size will auto set to the
@@ -113,64 +128,116 @@ class SerializedAttention(PointModule):
 
     @torch.no_grad()
     def get_padding_and_inverse(self, point):
-        pad_key = "pad"
-        unpad_key = "unpad"
-        cu_seqlens_key = "cu_seqlens_key"
-        if (
-            pad_key not in point.keys()
-            or unpad_key not in point.keys()
-            or cu_seqlens_key not in point.keys()
-        ):
-            offset = point.offset
-            bincount = offset2bincount(offset)
-            bincount_pad = (
-                torch.div(
-                    bincount + self.patch_size - 1,
-                    self.patch_size,
-                    rounding_mode="trunc",
-                )
-                * self.patch_size
+        # shared by the blocks of a stage (same offset), keyed by patch size
+        padding_key = f"padding_{self.patch_size}"
+        if padding_key not in point.keys():
+            point[padding_key] = self.build_padding_and_inverse(
+                point.offset, self.patch_size
             )
-            # only pad point when num of points larger than patch_size
-            mask_pad = bincount > self.patch_size
-            bincount_pad = ~mask_pad * bincount + mask_pad * bincount_pad
-            _offset = nn.functional.pad(offset, (1, 0))
-            _offset_pad = nn.functional.pad(torch.cumsum(bincount_pad, dim=0), (1, 0))
-            pad = torch.arange(_offset_pad[-1], device=offset.device)
-            unpad = torch.arange(_offset[-1], device=offset.device)
-            cu_seqlens = []
-            for i in range(len(offset)):
-                unpad[_offset[i] : _offset[i + 1]] += _offset_pad[i] - _offset[i]
-                if bincount[i] != bincount_pad[i]:
-                    pad[
-                        _offset_pad[i + 1]
-                        - self.patch_size
-                        + (bincount[i] % self.patch_size) : _offset_pad[i + 1]
-                    ] = pad[
-                        _offset_pad[i + 1]
-                        - 2 * self.patch_size
-                        + (bincount[i] % self.patch_size) : _offset_pad[i + 1]
-                        - self.patch_size
-                    ]
-                pad[_offset_pad[i] : _offset_pad[i + 1]] -= _offset_pad[i] - _offset[i]
-                cu_seqlens.append(
-                    torch.arange(
-                        _offset_pad[i],
-                        _offset_pad[i + 1],
-                        step=self.patch_size,
-                        dtype=torch.int32,
-                        device=offset.device,
-                    )
-                )
-            point[pad_key] = pad
-            point[unpad_key] = unpad
-            point[cu_seqlens_key] = nn.functional.pad(
-                torch.concat(cu_seqlens), (0, 1), value=_offset_pad[-1]
+        return point[padding_key]
+
+    @torch.no_grad()
+    def get_patch_index(self, point, cu_seqlens):
+        # padded position of every patch slot (num_patches, K) and its validity
+        patch_key = f"patch_index_{self.patch_size}"
+        if patch_key not in point.keys():
+            start = cu_seqlens[:-1].long().unsqueeze(-1)
+            slot = torch.arange(self.patch_size, device=start.device)
+            valid = slot < (cu_seqlens[1:].long().unsqueeze(-1) - start)
+            point[patch_key] = (torch.where(valid, start + slot, start), valid)
+        return point[patch_key]
+
+    @staticmethod
+    @torch.no_grad()
+    def build_padding_and_inverse(offset, patch_size):
+        """
+        Pad each sample with more than patch_size points to a multiple of
+        patch_size by repeating points of its previous patch. Returns pad
+        (padded position -> point), unpad (point -> padded position) and
+        cu_seqlens (patch boundaries of the padded points, int32).
+        """
+        bincount = offset2bincount(offset)
+        bincount_pad = (
+            torch.div(bincount + patch_size - 1, patch_size, rounding_mode="trunc")
+            * patch_size
+        )
+        # only pad point when num of points larger than patch_size
+        mask_pad = bincount > patch_size
+        bincount_pad = ~mask_pad * bincount + mask_pad * bincount_pad
+        num_patches = torch.div(
+            bincount_pad + patch_size - 1, patch_size, rounding_mode="trunc"
+        )
+        _offset = nn.functional.pad(offset, (1, 0))
+        _offset_pad = nn.functional.pad(torch.cumsum(bincount_pad, dim=0), (1, 0))
+        _offset_patch = nn.functional.pad(torch.cumsum(num_patches, dim=0), (1, 0))
+        # one sync for the output sizes
+        total, total_pad, total_patch = torch.stack(
+            [_offset[-1], _offset_pad[-1], _offset_patch[-1]]
+        ).tolist()
+
+        # sample index of every point, padded point and patch
+        samples = torch.arange(len(offset), device=offset.device)
+        sample = samples.repeat_interleave(bincount, output_size=total)
+        sample_pad = samples.repeat_interleave(bincount_pad, output_size=total_pad)
+        sample_patch = samples.repeat_interleave(num_patches, output_size=total_patch)
+
+        unpad = torch.arange(total, device=offset.device)
+        unpad += (_offset_pad - _offset)[sample]
+        # position in the padded sample, padding repeats the previous patch
+        local = torch.arange(total_pad, device=offset.device) - _offset_pad[sample_pad]
+        pad = local + _offset[sample_pad]
+        pad = torch.where(local >= bincount[sample_pad], pad - patch_size, pad)
+        # patch starts of every sample, closed by the total
+        patch = torch.arange(total_patch, device=offset.device)
+        patch -= _offset_patch[sample_patch]
+        cu_seqlens = _offset_pad[sample_patch] + patch * patch_size
+        cu_seqlens = nn.functional.pad(cu_seqlens, (0, 1), value=total_pad).int()
+        return pad, unpad, cu_seqlens
+
+    def chunked_attention(self, point, qkv, order, cu_seqlens):
+        """
+        Patch attention with scaled_dot_product_attention on chunks of at most
+        attn_chunk_size patches, so attention weights (and RPE bias) are only
+        materialized for one chunk. Short patches are masked to patch_size.
+        """
+        H = self.num_heads
+        K = self.patch_size
+        C = self.channels
+        index, valid = self.get_patch_index(point, cu_seqlens)
+        feat = qkv.new_empty(qkv.shape[0], C)
+        for start in range(0, index.shape[0], self.attn_chunk_size):
+            index_chunk = index[start : start + self.attn_chunk_size]
+            valid_chunk = valid[start : start + self.attn_chunk_size]
+            # (n, K, 3, H, C') => (3, n, H, K, C')
+            q, k, v = (
+                qkv[index_chunk]
+                .reshape(-1, K, 3, H, C // H)
+                .permute(2, 0, 3, 1, 4)
+                .unbind(dim=0)
             )
-        return point[pad_key], point[unpad_key], point[cu_seqlens_key]
+            if self.upcast_attention or self.upcast_softmax:
+                q, k, v = q.float(), k.float(), v.float()
+            # sdpa scales by C' ** -0.5 (no scale argument before torch 2.1)
+            q = q * (self.scale * (C // H) ** 0.5)
+            # key mask (n, 1, 1, K), or bias (n, H, K, K) with RPE
+            mask = valid_chunk[:, None, None, :]
+            if self.enable_rpe:
+                grid_coord = point.grid_coord[order[index_chunk]]
+                rel_pos = grid_coord.unsqueeze(2) - grid_coord.unsqueeze(1)
+                mask = self.rpe(rel_pos).to(q.dtype).masked_fill(~mask, float("-inf"))
+            feat_chunk = nn.functional.scaled_dot_product_attention(
+                q,
+                k,
+                v,
+                attn_mask=mask,
+                dropout_p=self.attn_drop if self.training else 0,
+            )
+            feat_chunk = feat_chunk.transpose(1, 2).reshape(-1, K, C)
+            feat[index_chunk[valid_chunk]] = feat_chunk[valid_chunk].to(qkv.dtype)
+        return feat
 
     def forward(self, point):
-        if not self.enable_flash:
+        if not self.enable_flash and not self.enable_sdpa:
             self.patch_size = min(
                 offset2bincount(point.offset).min().tolist(), self.patch_size_max
             )
@@ -187,7 +254,9 @@ class SerializedAttention(PointModule):
         # padding and reshape feat and batch for serialized point patch
         qkv = self.qkv(point.feat)[order]
 
-        if not self.enable_flash:
+        if self.enable_sdpa:
+            feat = self.chunked_attention(point, qkv, order, cu_seqlens)
+        elif not self.enable_flash:
             # encode and reshape qkv: (N', K, 3, H, C') => (3, N', H, K, C')
             q, k, v = (
                 qkv.reshape(-1, K, 3, H, C // H).permute(2, 0, 3, 1, 4).unbind(dim=0)
@@ -267,6 +336,8 @@ class Block(PointModule):
         cpe_indice_key=None,
         enable_rpe=False,
         enable_flash=True,
+        enable_sdpa=False,
+        attn_chunk_size=1024,
         upcast_attention=True,
         upcast_softmax=True,
     ):
@@ -298,6 +369,8 @@ class Block(PointModule):
             order_index=order_index,
             enable_rpe=enable_rpe,
             enable_flash=enable_flash,
+            enable_sdpa=enable_sdpa,
+            attn_chunk_size=attn_chunk_size,
             upcast_attention=upcast_attention,
             upcast_softmax=upcast_softmax,
         )
@@ -538,8 +611,11 @@ class PointTransformerV3(PointModule):
         drop_path=0.3,
         pre_norm=True,
         shuffle_orders=True,
+        serialization_depth=None,
         enable_rpe=False,
         enable_flash=True,
+        enable_sdpa=False,
+        attn_chunk_size=1024,
         upcast_attention=False,
         upcast_softmax=False,
         cls_mode=False,
@@ -555,6 +631,9 @@ class PointTransformerV3(PointModule):
         self.order = [order] if isinstance(order, str) else order
         self.cls_mode = cls_mode
         self.shuffle_orders = shuffle_orders
+        # None: adaptive per batch, or a fixed depth (e.g. 16) to use the
+        # serialization precomputed by the Serialize transform at that depth
+        self.serialization_depth = serialization_depth
 
         assert self.num_stages == len(stride) + 1
         assert self.num_stages == len(enc_depths)
@@ -639,6 +718,8 @@ class PointTransformerV3(PointModule):
                         cpe_indice_key=f"stage{s}",
                         enable_rpe=enable_rpe,
                         enable_flash=enable_flash,
+                        enable_sdpa=enable_sdpa,
+                        attn_chunk_size=attn_chunk_size,
                         upcast_attention=upcast_attention,
                         upcast_softmax=upcast_softmax,
                     ),
@@ -689,6 +770,8 @@ class PointTransformerV3(PointModule):
                             cpe_indice_key=f"stage{s}",
                             enable_rpe=enable_rpe,
                             enable_flash=enable_flash,
+                            enable_sdpa=enable_sdpa,
+                            attn_chunk_size=attn_chunk_size,
                             upcast_attention=upcast_attention,
                             upcast_softmax=upcast_softmax,
                         ),
@@ -698,7 +781,11 @@ class PointTransformerV3(PointModule):
 
     def forward(self, data_dict):
         point = Point(data_dict)
-        point.serialization(order=self.order, shuffle_orders=self.shuffle_orders)
+        point.serialization(
+            order=self.order,
+            depth=self.serialization_depth,
+            shuffle_orders=self.shuffle_orders,
+        )
         point.sparsify()
 
         point = self.embedding(point)
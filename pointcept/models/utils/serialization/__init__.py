@@ -1,4 +1,5 @@
 from .default import (
+    ORDERS,
     encode,
     decode,
     z_order_encode,
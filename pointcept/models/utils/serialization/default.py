@@ -1,13 +1,15 @@
 import torch
 from .z_order import xyz2key as z_order_encode_
 from .z_order import key2xyz as z_order_decode_
-from .hilbert import encode as hilbert_encode_
-from .hilbert import decode as hilbert_decode_
+from .hilbert import encode_lut as hilbert_encode_
+from .hilbert import decode_lut as hilbert_decode_
+
+ORDERS = ("z", "z-trans", "hilbert", "hilbert-trans")
 
 
 @torch.inference_mode()
 def encode(grid_coord, batch=None, depth=16, order="z"):
-    assert order in {"z", "z-trans", "hilbert", "hilbert-trans"}
+    assert order in ORDERS
     if order == "z":
         code = z_order_encode(grid_coord, depth=depth)
     elif order == "z-trans":
@@ -6,6 +6,8 @@ Author: Xiaoyang Wu (xiaoyang.wu.cs@gmail.com), Kaixin Xu
 Please cite our work if the code is helpful to you.
 """
 
+import functools
+import numpy as np
 import torch
 
 
@@ -301,3 +303,196 @@ def decode(hilberts, num_dims, num_bits):
 
     # Return them in the expected shape.
     return flat_locs.reshape((*orig_shape, num_dims))
+
+
+def _build_transitions(num_dims):
+    """Single level state machine of Skilling's transform.
+
+    The transform applied to the lower bits by the loops of encode / decode is a
+    signed permutation of the dimensions (exchanges with dimension 0, inversions
+    of dimension 0), determined by the gray bits of the higher levels. States
+    are the reachable signed permutations (perm, flip), mapping the bits x of a
+    level to its gray bits g[i] = x[perm[i]] ^ flip[i].
+
+    Returns:
+    --------
+     Tables of shape (num_states, 2**num_dims), indexed by state and by the bits
+     of a level (dimension 0 most significant): the gray bits of the level, the
+     location bits of a level given its gray bits (inverse), and the next state
+     given the gray bits of the level.
+    """
+    identity = (tuple(range(num_dims)), (0,) * num_dims)
+    states, index = [identity], {identity: 0}
+    gray, inverse, transition = [], [], []
+    i = 0
+    while i < len(states):
+        perm, flip = states[i]
+        gray.append([0] * 2**num_dims)
+        inverse.append([0] * 2**num_dims)
+        transition.append([0] * 2**num_dims)
+        for x in range(2**num_dims):
+            x_bits = [(x >> (num_dims - 1 - dim)) & 1 for dim in range(num_dims)]
+            g_bits = [x_bits[perm[dim]] ^ flip[dim] for dim in range(num_dims)]
+            g = sum(bit << (num_dims - 1 - dim) for dim, bit in enumerate(g_bits))
+            gray[i][x] = g
+            inverse[i][g] = x
+            # the dimension loop of encode, applied to the lower bits
+            next_perm, next_flip = list(perm), list(flip)
+            for dim in range(num_dims):
+                if g_bits[dim]:
+                    next_flip[0] ^= 1
+                else:
+                    next_perm[0], next_perm[dim] = next_perm[dim], next_perm[0]
+                    next_flip[0], next_flip[dim] = next_flip[dim], next_flip[0]
+            state = (tuple(next_perm), tuple(next_flip))
+            if state not in index:
+                index[state] = len(states)
+                states.append(state)
+            transition[i][g] = index[state]
+        i += 1
+    return gray, inverse, transition
+
+
+@functools.lru_cache(maxsize=None)
+def _build_lut(num_dims, num_levels, inverse, device):
+    """Lookup table processing num_levels levels of bits per step.
+
+    Indexed by state << (num_dims * num_levels) | bits, with the input bits of
+    the levels, dimension-major for locations (encode) and level-major for gray
+    codes (decode). Values pack next_state << (num_dims * num_levels) | bits,
+    with the output bits in the other layout.
+    """
+    gray, inv, transition = (np.array(t) for t in _build_transitions(num_dims))
+    num_states = len(gray)
+    width = num_dims * num_levels
+
+    def position(dim, level):
+        # bit of (dim, level) in the dimension-major layout
+        return num_levels * (num_dims - 1 - dim) + num_levels - 1 - level
+
+    state, bits = np.divmod(np.arange(num_states << width), 1 << width)
+    output = np.zeros_like(bits)
+    for level in range(num_levels):
+        if inverse:
+            g = (bits >> (num_dims * (num_levels - 1 - level))) & (2**num_dims - 1)
+            x = inv[state, g]
+            for dim in range(num_dims):
+                output |= ((x >> (num_dims - 1 - dim)) & 1) << position(dim, level)
+        else:
+            x = sum(
+                ((bits >> position(dim, level)) & 1) << (num_dims - 1 - dim)
+                for dim in range(num_dims)
+            )
+            g = gray[state, x]
+            output = output << num_dims | g
+        state = transition[state, g]
+    return torch.from_numpy(state << width | output).to(device)
+
+
+def _levels(num_bits, num_dims):
+    # levels per lookup, tables of at most 4096 entries per state
+    step = max(12 // num_dims, 1)
+    chunks = [step] * (num_bits // step)
+    if num_bits % step:
+        chunks.insert(0, num_bits % step)
+    return chunks
+
+
+def encode_lut(locs, num_dims, num_bits):
+    """Encode an array of locations in a hypercube into a Hilbert integer.
+
+    Bit-exact with encode, but runs Skilling's transform as a state machine on
+    integer codes, several levels of bits per table lookup, instead of on
+    unpacked bool tensors.
+
+    Params:
+    -------
+     locs - An ndarray of locations in a hypercube of num_dims dimensions, in
+            which each dimension runs from 0 to 2**num_bits-1.  The last
+            dimension of the shape needs to be num_dims.
+
+     num_dims - The dimensionality of the hypercube. Integer.
+
+     num_bits - The number of bits for each dimension. Integer.
+
+    Returns:
+    --------
+     The output is an ndarray of int64 integers with the same shape as the
+     input, excluding the last dimension.
+    """
+    if locs.shape[-1] != num_dims:
+        raise ValueError(
+            "The last dimension of locs is %d, but num_dims=%d."
+            % (locs.shape[-1], num_dims)
+        )
+    if num_dims * num_bits > 63:
+        raise ValueError(
+            "num_dims=%d and num_bits=%d for %d bits total, which can't be encoded"
+            " into a int64." % (num_dims, num_bits, num_dims * num_bits)
+        )
+    orig_shape = locs.shape[:-1]
+    locs = locs.reshape(-1, num_dims).long()
+    state = torch.zeros(locs.shape[0], dtype=torch.long, device=locs.device)
+    gray = torch.zeros_like(state)
+    level = num_bits
+    for num_levels in _levels(num_bits, num_dims):
+        lut = _build_lut(num_dims, num_levels, False, locs.device)
+        width = num_dims * num_levels
+        level -= num_levels
+        # bits of the levels, dimension-major
+        bits = (locs >> level) & (2**num_levels - 1)
+        for dim in range(num_dims):
+            state = state << num_levels | bits[:, dim]
+        value = lut[state]
+        gray = gray << width | (value & (2**width - 1))
+        state = value >> width
+    # gray code to binary, prefix xor from the most significant bit
+    shift = 1
+    while shift < num_dims * num_bits:
+        gray = gray ^ (gray >> shift)
+        shift *= 2
+    return gray.reshape(orig_shape)
+
+
+def decode_lut(hilberts, num_dims, num_bits):
+    """Decode an array of Hilbert integers into locations in a hypercube.
+
+    Bit-exact with decode, table based as encode_lut.
+
+    Params:
+    -------
+     hilberts - An ndarray of Hilbert integers.
+
+     num_dims - The dimensionality of the hypercube. Integer.
+
+     num_bits - The number of bits for each dimension. Integer.
+
+    Returns:
+    --------
+     The output is an ndarray of int64 integers with the same shape as hilberts
+     but with an additional dimension of size num_dims.
+    """
+    if num_dims * num_bits > 63:
+        raise ValueError(
+            "num_dims=%d and num_bits=%d for %d bits total, which can't be decoded"
+            " from a int64." % (num_dims, num_bits, num_dims * num_bits)
+        )
+    hilberts = torch.atleast_1d(hilberts)
+    orig_shape = hilberts.shape
+    binary = hilberts.reshape(-1).long() & (2 ** (num_dims * num_bits) - 1)
+    gray = binary ^ (binary >> 1)
+    state = torch.zeros_like(gray)
+    locs = torch.zeros(
+        (gray.shape[0], num_dims), dtype=torch.long, device=hilberts.device
+    )
+    level = num_bits
+    for num_levels in _levels(num_bits, num_dims):
+        lut = _build_lut(num_dims, num_levels, True, hilberts.device)
+        width = num_dims * num_levels
+        level -= num_levels
+        value = lut[state << width | (gray >> (num_dims * level)) & (2**width - 1)]
+        state = value >> width
+        for dim in range(num_dims):
+            bits = (value >> (num_levels * (num_dims - 1 - dim))) & (2**num_levels - 1)
+            locs[:, dim] = locs[:, dim] << num_levels | bits
+    return locs.reshape((*orig_shape, num_dims))
@@ -7,7 +7,7 @@ except ImportError:
     ocnn = None
 from addict import Dict
 
-from pointcept.models.utils.serialization import encode, decode
+from pointcept.models.utils.serialization import encode, decode, ORDERS
 from pointcept.models.utils import offset2batch, batch2offset
 
 
@@ -31,6 +31,8 @@ class Point(Dict):
     - "serialized_code": a list of serialization codes;
     - "serialized_order": a list of serialization order determined by code;
     - "serialized_inverse": a list of inverse mapping determined by code;
+    - "serial_code", "serial_order", "serial_inverse", "serial_type", "serial_depth":
+      serialization precomputed by the Serialize transform, consumed by serialization();
     (related to Sparsify: SpConv)
     - "sparse_shape": Sparse shape for Sparse Conv Tensor;
     - "sparse_conv_feat": SparseConvTensor init with information provide by Point;
@@ -64,6 +66,23 @@ class Point(Dict):
         if depth is None:
             # Adaptive measure the depth of serialization cube (length = 2 ^ depth)
             depth = int(self.grid_coord.max()).bit_length()
+
+        # serialization precomputed by the Serialize transform, (n, k) per key,
+        # used only if it was computed with the same orders at the same depth
+        serial = None
+        if "serial_order" in self.keys():
+            serial = [
+                self.pop(key)
+                for key in ["serial_code", "serial_order", "serial_inverse"]
+            ]
+            # (b * k) types of the batched samples, equal per sample once merged
+            serial_type = self.pop("serial_type")[: serial[0].shape[-1]]
+            serial_type = [ORDERS[i] for i in serial_type.tolist()]
+            serial_depth = int(self.pop("serial_depth")[0])
+            orders = [order] if isinstance(order, str) else list(order)
+            if serial_type != orders or serial_depth != depth:
+                serial = None
+
         self["serialized_depth"] = depth
         # Maximum bit length for serialization code is 63 (int64)
         assert depth * 3 + len(self.offset).bit_length() <= 63
@@ -78,18 +97,22 @@ class Point(Dict):
         #  Order2 ([n]),
         #   ...
         #  OrderN ([n])] (k, n)
-        code = [
-            encode(self.grid_coord, self.batch, depth, order=order_) for order_ in order
-        ]
-        code = torch.stack(code)
-        order = torch.argsort(code)
-        inverse = torch.zeros_like(order).scatter_(
-            dim=1,
-            index=order,
-            src=torch.arange(0, code.shape[1], device=order.device).repeat(
-                code.shape[0], 1
-            ),
-        )
+        if serial is not None:
+            code, order, inverse = (value.T.contiguous() for value in serial)
+        else:
+            code = [
+                encode(self.grid_coord, self.batch, depth, order=order_)
+                for order_ in order
+            ]
+            code = torch.stack(code)
+            order = torch.argsort(code)
+            inverse = torch.zeros_like(order).scatter_(
+                dim=1,
+                index=order,
+                src=torch.arange(0, code.shape[1], device=order.device).repeat(
+                    code.shape[0], 1
+                ),
+            )
 
         if shuffle_orders:
             perm = torch.randperm(code.shape[0])
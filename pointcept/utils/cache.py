@@ -1,56 +1,161 @@
 """
 Data Cache Utils
 
-Author: Xiaoyang Wu (xiaoyang.wu.cs@gmail.com)
-Please cite our work if the code is helpful to you.
+Node-local shared memory cache of raw scene assets. Each scene is stored as one
+file in /dev/shm laid out as [8 bytes header size][json index][aligned blobs],
+published atomically by rename and read through a read-only memory map, so all
+processes on a node share the same physical pages.
 """
 
 import os
-import SharedArray
+import json
+import time
+import numpy as np
 
-try:
-    from multiprocessing.shared_memory import ShareableList
-except ImportError:
-    import warnings
+ALIGNMENT = 64
 
-    warnings.warn("Please update python version >= 3.8 to enable shared_memory")
-import numpy as np
 
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+class SharedSceneCache(object):
+    """
+    Shared memory cache of scene asset dicts (only np.ndarray values are cached).
+
+    Args:
+        prefix (str): file name prefix of this cache, entries of different caches
+            never collide or evict each other.
+        budget (int): maximum total bytes of cached scenes, None for no limit other
+            than the size of the shared memory file system. The least recently used
+            scenes (file mtime) are evicted first.
+        root (str): shared memory file system.
+        run_id (str): scope of the entries, added to the prefix so that runs on the
+            same node neither share, evict nor clear each other's entries. Defaults
+            to POINTCEPT_RUN_ID (set by launch for all local ranks), else the pid.
+        touch_interval (float): seconds between mtime refreshes of a scene by one
+            process, hits in between only read the memory map.
+    """
+
+    def __init__(
+        self,
+        prefix="pointcept-",
+        budget=None,
+        root="/dev/shm",
+        run_id=None,
+        touch_interval=60,
+    ):
+        if run_id is None:
+            run_id = os.environ.get("POINTCEPT_RUN_ID", str(os.getpid()))
+        self.prefix = f"{prefix}{run_id}-"
+        self.budget = budget
+        self.root = root
+        self.touch_interval = touch_interval
+        self.touched = {}
+
+    def get_path(self, name):
+        return os.path.join(self.root, f"{self.prefix}{name}")
+
+    def get(self, name):
+        path = self.get_path(name)
+        try:
+            buffer = np.memmap(path, dtype=np.uint8, mode="r")
+            # refresh recency for LRU eviction, at most once per touch_interval
+            now, touched = time.monotonic(), self.touched.get(name)
+            if touched is None or now - touched >= self.touch_interval:
+                os.utime(path)
+                self.touched[name] = now
+        except (FileNotFoundError, ValueError):
+            return None
+        header_size = int(buffer[:8].view(np.uint64)[0])
+        header = json.loads(buffer[8 : 8 + header_size].tobytes().decode("utf-8"))
+        data_start = _align(8 + header_size)
+        return {
+            key: np.ndarray(
+                shape=meta["shape"],
+                dtype=np.dtype(meta["dtype"]),
+                buffer=buffer,
+                offset=data_start + meta["offset"],
+            )
+            for key, meta in header.items()
+        }
+
+    def put(self, name, data_dict):
+        path = self.get_path(name)
+        if os.path.exists(path):
+            return True
+        header = {}
+        cursor = 0
+        for key, value in data_dict.items():
+            if not isinstance(value, np.ndarray):
+                continue
+            cursor = _align(cursor)
+            header[key] = dict(
+                offset=cursor, dtype=value.dtype.str, shape=list(value.shape)
+            )
+            cursor += value.nbytes
+        header_bytes = json.dumps(header).encode("utf-8")
+        data_start = _align(8 + len(header_bytes))
+        size = data_start + cursor
+        if self.budget is not None and size > self.budget:
+            return False
+        self.evict(size)
+
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(np.uint64(len(header_bytes)).tobytes())
+                f.write(header_bytes)
+                for key, meta in header.items():
+                    f.seek(data_start + meta["offset"])
+                    f.write(np.ascontiguousarray(data_dict[key]).tobytes())
+                f.truncate(size)
+            # concurrent writers of the same scene are harmless, last rename wins
+            os.replace(tmp_path, path)
+        except OSError:
+            # shared memory is full, leave the scene uncached
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+        return True
+
+    def entries(self):
+        entries = []
+        with os.scandir(self.root) as it:
+            for entry in it:
+                if entry.name.startswith(self.prefix) and not entry.name.endswith(
+                    ".tmp"
+                ):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        return entries
+
+    def nbytes(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self, incoming=0):
+        if self.budget is None:
+            return
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total + incoming <= self.budget:
+                break
+            # processes holding the scene keep their mapping until released
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
 
-def shared_array(name, var=None):
-    if var is not None:
-        # check exist
-        if os.path.exists(f"/dev/shm/{name}"):
-            return SharedArray.attach(f"shm://{name}")
-        # create shared_array
-        data = SharedArray.create(f"shm://{name}", var.shape, dtype=var.dtype)
-        data[...] = var[...]
-        data.flags.writeable = False
-    else:
-        data = SharedArray.attach(f"shm://{name}").copy()
-    return data
-
-
-def shared_dict(name, var=None):
-    name = str(name)
-    assert "." not in name  # '.' is used as sep flag
-    data = {}
-    if var is not None:
-        assert isinstance(var, dict)
-        keys = var.keys()
-        # current version only cache np.array
-        keys_valid = []
-        for key in keys:
-            if isinstance(var[key], np.ndarray):
-                keys_valid.append(key)
-        keys = keys_valid
-
-        ShareableList(sequence=keys, name=name + ".keys")
-        for key in keys:
-            if isinstance(var[key], np.ndarray):
-                data[key] = shared_array(name=f"{name}.{key}", var=var[key])
-    else:
-        keys = list(ShareableList(name=name + ".keys"))
-        for key in keys:
-            data[key] = shared_array(name=f"{name}.{key}")
-    return data
+    def clear(self):
+        with os.scandir(self.root) as it:
+            for entry in it:
+                if entry.name.startswith(self.prefix):
+                    try:
+                        os.remove(entry.path)
+                    except FileNotFoundError:
+                        pass
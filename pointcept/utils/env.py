@@ -34,3 +34,33 @@ def set_seed(seed=None):
     cudnn.benchmark = False
     cudnn.deterministic = True
     os.environ["PYTHONHASHSEED"] = str(seed)
+
+
+def get_rng_state():
+    # numpy keys as a tensor, so that checkpoints load with weights_only
+    name, keys, pos, has_gauss, cached_gaussian = np.random.get_state()
+    state = dict(
+        random=random.getstate(),
+        numpy=(
+            name,
+            torch.from_numpy(keys.astype(np.int64)),
+            pos,
+            has_gauss,
+            cached_gaussian,
+        ),
+        torch=torch.get_rng_state(),
+    )
+    if torch.cuda.is_available():
+        state["cuda"] = torch.cuda.get_rng_state_all()
+    return state
+
+
+def set_rng_state(state):
+    random.setstate(state["random"])
+    name, keys, pos, has_gauss, cached_gaussian = state["numpy"]
+    keys = keys.cpu().numpy().astype(np.uint32)
+    np.random.set_state((name, keys, pos, has_gauss, cached_gaussian))
+    # checkpoints may be loaded onto the gpu, rng states are cpu byte tensors
+    torch.set_rng_state(state["torch"].cpu())
+    if torch.cuda.is_available() and "cuda" in state:
+        torch.cuda.set_rng_state_all([s.cpu() for s in state["cuda"]])
@@ -0,0 +1,117 @@
+"""
+Scene Manifest
+
+Index of the scenes in a Pointcept processed split and of their .npy assets
+(shape and dtype), persisted as data_root/{split}.manifest.json. The manifest
+is rebuilt when the mtime of any indexed folder changes, so datasets can be
+built and fetched without listing folders on shared storage.
+"""
+
+import os
+import glob
+import json
+import numpy as np
+
+from .logger import get_root_logger
+
+MANIFEST_SUFFIX = ".manifest.json"
+
+
+def get_manifest_path(data_root, split):
+    return os.path.join(data_root, f"{split}{MANIFEST_SUFFIX}")
+
+
+def read_npy_header(path):
+    with open(path, "rb") as f:
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, _, dtype = np.lib.format.read_array_header_1_0(f)
+        else:
+            shape, _, dtype = np.lib.format.read_array_header_2_0(f)
+    return list(shape), dtype.str
+
+
+class SceneManifest(object):
+    """
+    Scenes of data_root/split matched by pattern (e.g. "*", "*/*",
+    "scene_*/room_*"), keyed by their path relative to data_root.
+    """
+
+    def __init__(self, data_root, split, pattern="*"):
+        self.data_root = data_root
+        self.split = split
+        self.pattern = pattern
+        self.path = get_manifest_path(data_root, split)
+        self.scenes = self.load()
+        if self.scenes is None:
+            self.scenes = self.build()
+
+    def load(self):
+        if not os.path.isfile(self.path):
+            return None
+        try:
+            with open(self.path, "r") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if manifest.get("pattern") != self.pattern:
+            return None
+        for folder, mtime in manifest["mtime"].items():
+            try:
+                if os.stat(os.path.join(self.data_root, folder)).st_mtime_ns != mtime:
+                    return None
+            except OSError:
+                return None
+        return manifest["scenes"]
+
+    def build(self):
+        logger = get_root_logger()
+        logger.info(f"Building scene manifest: {self.path}")
+        split_root = os.path.join(self.data_root, self.split)
+        scenes = {}
+        # folders whose content decides the data list or the assets of a scene
+        folders = {split_root}
+        for scene_path in sorted(glob.glob(os.path.join(split_root, self.pattern))):
+            if not os.path.isdir(scene_path):
+                continue
+            key = os.path.relpath(scene_path, self.data_root)
+            scenes[key] = {}
+            for asset in sorted(os.listdir(scene_path)):
+                if not asset.endswith(".npy"):
+                    continue
+                shape, dtype = read_npy_header(os.path.join(scene_path, asset))
+                scenes[key][asset[:-4]] = dict(shape=shape, dtype=dtype)
+            folder = scene_path
+            while folder != split_root:
+                folders.add(folder)
+                folder = os.path.dirname(folder)
+        mtime = {
+            os.path.relpath(folder, self.data_root): os.stat(folder).st_mtime_ns
+            for folder in folders
+        }
+        manifest = dict(split=self.split, pattern=self.pattern, mtime=mtime)
+        manifest["scenes"] = scenes
+        try:
+            # each rank may build concurrently, replace atomically
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(manifest, f)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            logger.warning(f"Failed to save scene manifest: {self.path}")
+        return scenes
+
+    def keys(self):
+        return self.scenes.keys()
+
+    def __contains__(self, scene):
+        return scene in self.scenes
+
+    def __len__(self):
+        return len(self.scenes)
+
+    def get_assets(self, scene):
+        return self.scenes[scene]
+
+    def get_num_points(self, scene, asset="coord"):
+        return self.scenes[scene][asset]["shape"][0]
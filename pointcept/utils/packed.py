@@ -0,0 +1,155 @@
+"""
+Packed Scene Store
+
+Pack a Pointcept processed split (data_root/split/scene/*.npy) into one
+memory-mappable file with an offset index per scene and per asset.
+
+File layout:
+    [8 bytes magic][8 bytes header size (uint64, little endian)][json header][data]
+The data section starts at the first ALIGNMENT boundary after the header, each
+asset blob is aligned to ALIGNMENT bytes and addressed by its offset in the data section.
+"""
+
+import os
+import json
+import numpy as np
+
+MAGIC = b"PCPACK01"
+ALIGNMENT = 64
+PACK_SUFFIX = ".pack"
+
+
+def get_pack_path(data_root, split):
+    return os.path.join(data_root, f"{split}{PACK_SUFFIX}")
+
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def find_scenes(data_root, split):
+    """
+    Find all scene folders (folders directly containing .npy assets) under
+    data_root/split, return their paths relative to data_root.
+    """
+    scenes = []
+    for root, dirs, files in os.walk(os.path.join(data_root, split)):
+        dirs.sort()
+        if any(file.endswith(".npy") for file in files):
+            scenes.append(os.path.relpath(root, data_root))
+    return scenes
+
+
+def pack_scenes(data_root, split, output_path=None, assets=None):
+    """
+    Convert data_root/split/**/scene/*.npy into a single packed file.
+
+    Args:
+        data_root (str): root of the processed dataset.
+        split (str): split folder to pack.
+        output_path (str): packed file path, default is data_root/{split}.pack.
+        assets (Sequence[str]): asset names to pack, default is all .npy files.
+    Returns:
+        (str): path of the packed file.
+    """
+    output_path = output_path or get_pack_path(data_root, split)
+    scenes = find_scenes(data_root, split)
+
+    # first pass: read headers only and plan offsets
+    index = {}
+    blobs = []
+    cursor = 0
+    for scene in scenes:
+        scene_path = os.path.join(data_root, scene)
+        index[scene] = {}
+        for asset in sorted(os.listdir(scene_path)):
+            if not asset.endswith(".npy"):
+                continue
+            if assets is not None and asset[:-4] not in assets:
+                continue
+            array = np.load(os.path.join(scene_path, asset), mmap_mode="r")
+            cursor = _align(cursor)
+            index[scene][asset[:-4]] = dict(
+                offset=cursor, dtype=array.dtype.str, shape=list(array.shape)
+            )
+            blobs.append((cursor, os.path.join(scene_path, asset)))
+            cursor += array.nbytes
+
+    header = json.dumps(dict(split=split, scenes=index)).encode("utf-8")
+    data_start = _align(len(MAGIC) + 8 + len(header))
+
+    # second pass: stream assets into place
+    with open(output_path + ".tmp", "wb") as f:
+        f.write(MAGIC)
+        f.write(np.uint64(len(header)).tobytes())
+        f.write(header)
+        for offset, path in blobs:
+            array = np.load(path, mmap_mode="r")
+            f.seek(data_start + offset)
+            f.write(np.ascontiguousarray(array).tobytes())
+    os.replace(output_path + ".tmp", output_path)
+    return output_path
+
+
+class PackedSceneStore(object):
+    """
+    Read-only view of a packed split. The file is memory-mapped lazily in each
+    process (DataLoader workers included), assets are returned as zero-copy,
+    non-writeable numpy views into the mapping.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.split, self.scenes = self.read_header(path)
+        self._mmap = None
+
+    @staticmethod
+    def read_header(path):
+        with open(path, "rb") as f:
+            magic = f.read(len(MAGIC))
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a Pointcept packed scene file.")
+            header_size = int(np.frombuffer(f.read(8), dtype=np.uint64)[0])
+            header = json.loads(f.read(header_size).decode("utf-8"))
+        data_start = _align(len(MAGIC) + 8 + header_size)
+        for scene in header["scenes"].values():
+            for meta in scene.values():
+                meta["offset"] += data_start
+        return header["split"], header["scenes"]
+
+    @property
+    def mmap(self):
+        if self._mmap is None:
+            self._mmap = np.memmap(self.path, dtype=np.uint8, mode="r")
+        return self._mmap
+
+    def keys(self):
+        return self.scenes.keys()
+
+    def __contains__(self, scene):
+        return scene in self.scenes
+
+    def __len__(self):
+        return len(self.scenes)
+
+    def get_asset(self, scene, asset):
+        meta = self.scenes[scene][asset]
+        return np.ndarray(
+            shape=meta["shape"],
+            dtype=np.dtype(meta["dtype"]),
+            buffer=self.mmap,
+            offset=meta["offset"],
+        )
+
+    def get(self, scene, assets=None):
+        return {
+            asset: self.get_asset(scene, asset)
+            for asset in self.scenes[scene].keys()
+            if assets is None or asset in assets
+        }
+
+    def __getstate__(self):
+        # never pickle the mapping itself, each process maps the file on its own
+        state = self.__dict__.copy()
+        state["_mmap"] = None
+        return state
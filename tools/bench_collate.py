@@ -0,0 +1,113 @@
+"""
+Collate Benchmark
+
+Compare the recursive collate_fn with the preallocated fast_collate_fn used by
+point_collate_fn for Collect outputs, in the main process and through
+DataLoader workers (where the fast path collates directly into shared memory)
+and with the shared memory slab transport (pointcept.datasets.transport).
+
+    python tools/bench_collate.py --batch-size 8 --num-points 100000
+"""
+
+import argparse
+import time
+import torch
+import torch.utils.data
+
+from pointcept.datasets.utils import collate_fn, fast_collate_fn
+from pointcept.datasets.transport import build_slab_loader
+
+
+class SyntheticDataset(torch.utils.data.Dataset):
+    """
+    Samples shaped like the output of Collect(keys=("coord", "grid_coord",
+    "segment"), feat_keys=("color", "normal")).
+    """
+
+    def __init__(self, length, num_points, num_samples=8):
+        self.length = length
+        # pre-generated so that the benchmark measures collate and transfer only
+        self.samples = [self.generate(i, num_points) for i in range(num_samples)]
+
+    @staticmethod
+    def generate(idx, num_points):
+        generator = torch.Generator().manual_seed(idx)
+        num_points = num_points + idx % 7 * 1000
+        return dict(
+            coord=torch.rand(num_points, 3, generator=generator),
+            grid_coord=torch.randint(0, 1000, (num_points, 3), generator=generator),
+            segment=torch.randint(0, 20, (num_points,), generator=generator),
+            offset=torch.tensor([num_points]),
+            feat=torch.rand(num_points, 6, generator=generator),
+        )
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, idx):
+        return self.samples[idx % len(self.samples)]
+
+
+def timeit(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch-size", default=8, type=int)
+    parser.add_argument("--num-points", default=100000, type=int)
+    parser.add_argument("--num-workers", default=2, type=int)
+    parser.add_argument("--num-batches", default=20, type=int)
+    parser.add_argument("--repeat", default=10, type=int)
+    args = parser.parse_args()
+
+    dataset = SyntheticDataset(args.batch_size * args.num_batches, args.num_points)
+    batch = [dataset[i] for i in range(args.batch_size)]
+    reference, output = collate_fn(batch), fast_collate_fn(batch)
+    assert reference.keys() == output.keys()
+    for key in reference.keys():
+        assert torch.equal(reference[key], output[key]), key
+
+    print(f"batch size {args.batch_size}, ~{args.num_points} points per sample")
+    reference_time = timeit(lambda: collate_fn(batch), args.repeat)
+    output_time = timeit(lambda: fast_collate_fn(batch), args.repeat)
+    print(
+        f"[main process] collate_fn: {reference_time * 1000:.2f} ms, "
+        f"fast_collate_fn: {output_time * 1000:.2f} ms, "
+        f"speedup: {reference_time / output_time:.2f}x"
+    )
+
+    for name in ["collate_fn", "fast_collate_fn", "slab transport"]:
+        if name == "slab transport":
+            loader = build_slab_loader(
+                dataset,
+                batch_size=args.batch_size,
+                num_workers=args.num_workers,
+                slab_size=256 * 1024**2,
+                pin_memory=False,
+            )
+        else:
+            loader = torch.utils.data.DataLoader(
+                dataset,
+                batch_size=args.batch_size,
+                num_workers=args.num_workers,
+                collate_fn=collate_fn if name == "collate_fn" else fast_collate_fn,
+            )
+        iterator = iter(loader)
+        next(iterator)  # exclude worker start-up
+        start = time.perf_counter()
+        num_batches = sum(1 for _ in iterator)
+        elapsed = time.perf_counter() - start
+        print(
+            f"[{args.num_workers} workers] {name}: "
+            f"{num_batches / elapsed:.2f} batches/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""
+Data Pipeline Benchmark
+
+Measure the CPU throughput of a config's data pipeline (dataset loading,
+transforms, DataLoader workers and collate) without building a model or using
+a GPU, sweeping the number of workers and the batch size.
+
+    python tools/bench_data.py --config-file configs/scannet/semseg-pt-v3m1-0-base.py \
+        --splits train --num-workers 4 8 16 --batch-sizes 2 4 --num-batches 50
+"""
+
+import argparse
+import os
+import resource
+import time
+from collections.abc import Mapping
+from functools import partial
+
+import numpy as np
+import torch
+import torch.utils.data
+
+from pointcept.datasets import build_dataset, point_collate_fn
+from pointcept.engines.defaults import worker_init_fn
+from pointcept.utils.config import Config, DictAction
+
+
+class TimedDataset(torch.utils.data.Dataset):
+    """
+    Wrap a dataset to report, with each sample, the worker that produced it,
+    the time it took and the peak RSS of that worker.
+    """
+
+    def __init__(self, dataset):
+        self.dataset = dataset
+
+    def __len__(self):
+        return len(self.dataset)
+
+    def __getitem__(self, idx):
+        start = time.perf_counter()
+        data = self.dataset[idx]
+        latency = time.perf_counter() - start
+        worker_info = torch.utils.data.get_worker_info()
+        worker_id = worker_info.id if worker_info is not None else -1
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        return data, (worker_id, latency, rss)
+
+
+def timed_collate_fn(batch, collate_fn):
+    data, timing = zip(*batch)
+    return collate_fn(list(data)), list(timing)
+
+
+def test_collate_fn(batch):
+    # test samples hold a fragment list, keep them as is like the testers
+    return batch
+
+
+def count_points(data):
+    if isinstance(data, Mapping):
+        if "fragment_list" in data.keys():
+            return count_points(data["fragment_list"])
+        if "offset" in data.keys():
+            return int(data["offset"][-1])
+        if "coord" in data.keys():
+            return int(data["coord"].shape[0])
+        return 0
+    elif isinstance(data, (list, tuple)):
+        return sum(count_points(d) for d in data)
+    return 0
+
+
+def benchmark(dataset, split, num_workers, batch_size, num_batches, warmup, seed):
+    collate_fn = (
+        test_collate_fn if split == "test" else partial(point_collate_fn, mix_prob=0)
+    )
+    loader = torch.utils.data.DataLoader(
+        TimedDataset(dataset),
+        batch_size=batch_size,
+        shuffle=split == "train",
+        num_workers=num_workers,
+        collate_fn=partial(timed_collate_fn, collate_fn=collate_fn),
+        worker_init_fn=partial(
+            worker_init_fn, num_workers=num_workers, rank=0, seed=seed
+        ),
+        drop_last=split == "train",
+    )
+    latency = {}
+    worker_rss = {}
+    num_samples, num_points = 0, 0
+    start = time.perf_counter()
+    for i, (data, timing) in enumerate(loader):
+        if i == warmup:
+            # exclude worker start-up and first fetch
+            start = time.perf_counter()
+        if i >= warmup:
+            num_samples += len(timing)
+            num_points += count_points(data)
+            for worker_id, seconds, rss in timing:
+                latency.setdefault(worker_id, []).append(seconds)
+                worker_rss[worker_id] = max(worker_rss.get(worker_id, 0), rss)
+        if i + 1 >= warmup + num_batches:
+            break
+    elapsed = time.perf_counter() - start
+    del loader
+    return dict(
+        samples_per_second=num_samples / max(elapsed, 1e-12),
+        points_per_second=num_points / max(elapsed, 1e-12),
+        latency={key: np.array(value) for key, value in sorted(latency.items())},
+        worker_rss=worker_rss,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--config-file", required=True, metavar="FILE", help="path to config file"
+    )
+    parser.add_argument(
+        "--splits",
+        default=["train"],
+        nargs="+",
+        choices=["train", "val", "test"],
+        help="data splits to benchmark, e.g. --splits train val",
+    )
+    parser.add_argument("--num-workers", default=[0, 4, 8], type=int, nargs="+")
+    parser.add_argument("--batch-sizes", default=[2], type=int, nargs="+")
+    parser.add_argument("--num-batches", default=20, type=int)
+    parser.add_argument(
+        "--warmup", default=2, type=int, help="batches excluded from timing"
+    )
+    parser.add_argument("--seed", default=0, type=int)
+    parser.add_argument(
+        "--options", nargs="+", action=DictAction, help="custom options"
+    )
+    args = parser.parse_args()
+
+    # no save path, model or gpu is needed, only read the config
+    cfg = Config.fromfile(args.config_file)
+    if args.options is not None:
+        cfg.merge_from_dict(args.options)
+    torch.set_num_threads(1)
+
+    print(f"Config: {args.config_file}, CPUs: {os.cpu_count()}")
+    for split in args.splits:
+        dataset = build_dataset(cfg.data[split])
+        print(f"[{split}] {type(dataset).__name__}: {len(dataset)} samples")
+        print(
+            f"{'workers':>8}{'batch':>7}{'samples/s':>12}{'points/s':>14}"
+            f"{'p50 (ms)':>11}{'p90 (ms)':>11}{'p99 (ms)':>11}"
+            f"{'worker RSS (MB)':>17}"
+        )
+        for num_workers in args.num_workers:
+            for batch_size in args.batch_sizes:
+                result = benchmark(
+                    dataset,
+                    split,
+                    num_workers,
+                    batch_size,
+                    args.num_batches,
+                    args.warmup,
+                    args.seed,
+                )
+                if not result["latency"]:
+                    print(
+                        f"{num_workers:>8}{batch_size:>7}  no batch left after "
+                        f"{args.warmup} warmup batch(es)"
+                    )
+                    continue
+                latency = np.concatenate(list(result["latency"].values()))
+                p50, p90, p99 = np.percentile(latency, [50, 90, 99]) * 1000
+                rss = max(result["worker_rss"].values()) / 1024**2
+                print(
+                    f"{num_workers:>8}{batch_size:>7}"
+                    f"{result['samples_per_second']:>12.2f}"
+                    f"{result['points_per_second']:>14.0f}"
+                    f"{p50:>11.1f}{p90:>11.1f}{p99:>11.1f}{rss:>17.0f}"
+                )
+                for worker_id, value in result["latency"].items():
+                    p50, p90, p99 = np.percentile(value, [50, 90, 99]) * 1000
+                    print(
+                        f"{'':>15}worker {worker_id:>3}: {len(value):>5} samples, "
+                        f"p50 {p50:.1f} ms, p90 {p90:.1f} ms, p99 {p99:.1f} ms"
+                    )
+    # RUSAGE_CHILDREN covers exited DataLoader workers
+    main_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    child_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    print(f"Peak RSS: main {main_rss:.0f} MB, largest worker {child_rss:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
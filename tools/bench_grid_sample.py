@@ -0,0 +1,124 @@
+"""
+GridSample Benchmark
+
+Time GridSample voxelization on a synthetic LiDAR-like tile against the previous
+np.unique based implementation, and check both produce identical outputs.
+
+    python tools/bench_grid_sample.py --num_points 5000000 --grid_size 0.025
+"""
+
+import argparse
+import time
+import numpy as np
+
+from pointcept.datasets.transform import GridSample
+
+
+def reference_fnv_hash_vec(arr):
+    arr = arr.copy()
+    arr = arr.astype(np.uint64, copy=False)
+    hashed_arr = np.uint64(14695981039346656037) * np.ones(
+        arr.shape[0], dtype=np.uint64
+    )
+    for j in range(arr.shape[1]):
+        hashed_arr *= np.uint64(1099511628211)
+        hashed_arr = np.bitwise_xor(hashed_arr, arr[:, j])
+    return hashed_arr
+
+
+def reference_ravel_hash_vec(arr):
+    arr = arr.copy()
+    arr -= arr.min(0)
+    arr = arr.astype(np.uint64, copy=False)
+    arr_max = arr.max(0).astype(np.uint64) + 1
+    keys = np.zeros(arr.shape[0], dtype=np.uint64)
+    for j in range(arr.shape[1] - 1):
+        keys += arr[:, j]
+        keys *= arr_max[j + 1]
+    keys += arr[:, -1]
+    return keys
+
+
+def reference_grid_sample(coord, grid_size, hash_type):
+    # GridSample(mode="train") voxelization before the single pass grouping
+    hash = reference_fnv_hash_vec if hash_type == "fnv" else reference_ravel_hash_vec
+    grid_coord = np.floor(coord / np.array(grid_size)).astype(int)
+    grid_coord -= grid_coord.min(0)
+    key = hash(grid_coord)
+    idx_sort = np.argsort(key)
+    key_sort = key[idx_sort]
+    _, inverse, count = np.unique(key_sort, return_inverse=True, return_counts=True)
+    idx_select = (
+        np.cumsum(np.insert(count, 0, 0)[0:-1])
+        + np.random.randint(0, count.max(), count.size) % count
+    )
+    idx_unique = idx_sort[idx_select]
+    inverse_ = np.zeros_like(inverse)
+    inverse_[idx_sort] = inverse
+    return dict(index=idx_unique, inverse=inverse_, grid_coord=grid_coord[idx_unique])
+
+
+def grid_sample(coord, grid_size, hash_type):
+    transform = GridSample(
+        grid_size=grid_size,
+        hash_type=hash_type,
+        mode="train",
+        keys=("index",),
+        return_inverse=True,
+        return_grid_coord=True,
+    )
+    data_dict = transform(dict(coord=coord, index=np.arange(coord.shape[0])))
+    return dict(
+        index=data_dict["index"],
+        inverse=data_dict["inverse"],
+        grid_coord=data_dict["grid_coord"],
+    )
+
+
+def synthetic_tile(num_points, seed=0):
+    # ground layer with sparse vertical structures, similar to aerial LiDAR tiles
+    rng = np.random.default_rng(seed)
+    xy = rng.random((num_points, 2)) * 60
+    z = rng.random(num_points) * 0.3
+    z += (rng.random(num_points) < 0.2) * rng.random(num_points) * 8
+    return np.concatenate([xy, z[:, None]], axis=1).astype(np.float32)
+
+
+def timeit(func, repeat, *args):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num_points", default=5000000, type=int)
+    parser.add_argument("--grid_size", default=0.025, type=float)
+    parser.add_argument("--repeat", default=3, type=int)
+    args = parser.parse_args()
+
+    coord = synthetic_tile(args.num_points)
+    print(f"{args.num_points} points, grid size {args.grid_size}")
+    for hash_type in ["fnv", "ravel"]:
+        np.random.seed(0)
+        reference = reference_grid_sample(coord, args.grid_size, hash_type)
+        np.random.seed(0)
+        output = grid_sample(coord, args.grid_size, hash_type)
+        for key in reference.keys():
+            assert np.array_equal(reference[key], output[key]), key
+        reference_time = timeit(
+            reference_grid_sample, args.repeat, coord, args.grid_size, hash_type
+        )
+        output_time = timeit(grid_sample, args.repeat, coord, args.grid_size, hash_type)
+        print(
+            f"[{hash_type}] voxels: {reference['index'].shape[0]}, "
+            f"reference: {reference_time:.3f}s, GridSample: {output_time:.3f}s, "
+            f"speedup: {reference_time / output_time:.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
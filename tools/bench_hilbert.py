@@ -0,0 +1,114 @@
+"""
+Hilbert Benchmark
+
+Check the table based Hilbert encode_lut / decode_lut against the bool tensor
+reference encode / decode (bit-exact codes, decode round trip) and compare
+their speed on CPU and, if available, GPU.
+
+    python tools/bench_hilbert.py --num-points 1000000 --depth 16
+"""
+
+import argparse
+import importlib.util
+import os
+import time
+import torch
+
+# hilbert.py is loaded on its own, importing it through the package would
+# import pointcept.models and its compiled dependencies (spconv, torch_scatter)
+spec = importlib.util.spec_from_file_location(
+    "hilbert",
+    os.path.join(
+        os.path.dirname(os.path.abspath(__file__)),
+        "..",
+        "pointcept",
+        "models",
+        "utils",
+        "serialization",
+        "hilbert.py",
+    ),
+)
+hilbert = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(hilbert)
+encode, decode = hilbert.encode, hilbert.decode
+encode_lut, decode_lut = hilbert.encode_lut, hilbert.decode_lut
+
+
+def timeit(func, repeat, device):
+    func()  # warm up, builds the lookup tables
+    best = float("inf")
+    for _ in range(repeat):
+        if device.type == "cuda":
+            torch.cuda.synchronize()
+        start = time.perf_counter()
+        func()
+        if device.type == "cuda":
+            torch.cuda.synchronize()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def check(device, num_points):
+    for num_dims, max_bits in [(1, 24), (2, 24), (3, 21), (4, 15)]:
+        for num_bits in range(1, max_bits + 1):
+            locs = torch.randint(0, 2**num_bits, (num_points, num_dims), device=device)
+            code = encode_lut(locs, num_dims, num_bits)
+            assert torch.equal(
+                code, encode(locs.clone(), num_dims, num_bits)
+            ), f"encode mismatch, num_dims={num_dims}, num_bits={num_bits}"
+            assert torch.equal(
+                decode_lut(code, num_dims, num_bits), locs
+            ), f"round trip mismatch, num_dims={num_dims}, num_bits={num_bits}"
+            assert torch.equal(
+                decode_lut(code, num_dims, num_bits),
+                decode(code.clone(), num_dims, num_bits),
+            ), f"decode mismatch, num_dims={num_dims}, num_bits={num_bits}"
+    # the whole curve visits every cell once, neighbours are adjacent
+    locs = torch.stack(
+        torch.meshgrid(*[torch.arange(8, device=device)] * 3, indexing="ij"), -1
+    ).reshape(-1, 3)
+    code = encode_lut(locs, 3, 3)
+    assert torch.equal(code.sort()[0], torch.arange(512, device=device))
+    path = decode_lut(torch.arange(512, device=device), 3, 3)
+    assert (path.diff(dim=0).abs().sum(-1) == 1).all()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num-points", default=1000000, type=int)
+    parser.add_argument("--depth", default=16, type=int)
+    parser.add_argument("--repeat", default=5, type=int)
+    args = parser.parse_args()
+
+    devices = [torch.device("cpu")]
+    if torch.cuda.is_available():
+        devices.append(torch.device("cuda"))
+    for device in devices:
+        check(device, 2000)
+        print(f"[{device.type}] encode / decode checks passed")
+        locs = torch.randint(0, 2**args.depth, (args.num_points, 3), device=device)
+        code = encode_lut(locs, 3, args.depth)
+        print(f"[{device.type}] {args.num_points} points, depth {args.depth}")
+        for name, reference, output in [
+            (
+                "encode",
+                lambda: encode(locs.clone(), 3, args.depth),
+                lambda: encode_lut(locs, 3, args.depth),
+            ),
+            (
+                "decode",
+                lambda: decode(code.clone(), 3, args.depth),
+                lambda: decode_lut(code, 3, args.depth),
+            ),
+        ]:
+            reference_time = timeit(reference, args.repeat, device)
+            output_time = timeit(output, args.repeat, device)
+            print(
+                f"  {name}: reference {reference_time * 1000:.2f} ms, "
+                f"lut {output_time * 1000:.2f} ms, "
+                f"speedup: {reference_time / output_time:.2f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
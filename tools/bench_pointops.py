@@ -0,0 +1,195 @@
+"""
+Pointops Benchmark
+
+Check the CPU backends of pointops (knn_query, ball_query, farthest point
+sampling, grouping, interpolation) against brute force references and, if
+available, against the CUDA kernels, then compare their speed.
+
+    python tools/bench_pointops.py --num-points 50000 --batch-size 4
+"""
+
+import argparse
+import time
+import torch
+
+import pointops
+
+
+def timeit(func, repeat, device):
+    func()  # warm up
+    best = float("inf")
+    for _ in range(repeat):
+        if device.type == "cuda":
+            torch.cuda.synchronize()
+        start = time.perf_counter()
+        func()
+        if device.type == "cuda":
+            torch.cuda.synchronize()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def generate(batch_size, num_points, ratio=4):
+    counts = [num_points + i * 997 for i in range(batch_size)]
+    new_counts = [count // ratio for count in counts]
+    xyz = torch.rand(sum(counts), 3) * 10
+    offset = torch.tensor(counts).cumsum(0).int()
+    new_offset = torch.tensor(new_counts).cumsum(0).int()
+    start = [0] + offset.tolist()[:-1]
+    new_xyz = xyz[
+        torch.cat(
+            [torch.randperm(c)[:n] + s for c, n, s in zip(counts, new_counts, start)]
+        )
+    ].contiguous()
+    return xyz, offset, new_xyz, new_offset
+
+
+def ranges(offset):
+    end = offset.tolist()
+    return zip([0] + end[:-1], end)
+
+
+def check_cpu(nsample=16, radius=0.4):
+    xyz, offset, new_xyz, new_offset = generate(3, 2000)
+    # knn: nearest neighbors of the same sample, by torch.cdist
+    idx, dist = pointops.knn_query(nsample, xyz, offset, new_xyz, new_offset)
+    for (start, end), (new_start, new_end) in zip(ranges(offset), ranges(new_offset)):
+        ref_dist, ref_idx = torch.cdist(
+            new_xyz[new_start:new_end].double(), xyz[start:end].double()
+        ).topk(nsample, largest=False)
+        assert torch.allclose(dist[new_start:new_end], ref_dist.float(), atol=1e-4)
+        assert (idx[new_start:new_end] == ref_idx + start).float().mean() > 0.999
+    # ball query: every returned neighbor is a candidate, distances match
+    for query in [pointops.ball_query, pointops.random_ball_query]:
+        idx, dist = query(nsample, radius, 0, xyz, offset, new_xyz, new_offset)
+        valid = idx >= 0
+        real = (xyz[idx.clamp(min=0).long()] - new_xyz.unsqueeze(1)).norm(dim=-1)
+        assert (real[valid] < radius).all()
+        assert torch.allclose(dist[valid], real[valid], atol=1e-4)
+    # farthest point sampling: greedy max-min distance from the first point
+    idx = pointops.farthest_point_sampling(xyz, offset, new_offset)
+    for (start, end), (new_start, new_end) in zip(ranges(offset), ranges(new_offset)):
+        points, ref = xyz[start:end], [0]
+        dist = torch.full((end - start,), 1e10)
+        for _ in range(new_end - new_start - 1):
+            dist = torch.minimum(dist, ((points - points[ref[-1]]) ** 2).sum(1))
+            ref.append(int(dist.argmax()))
+        assert idx[new_start:new_end].tolist() == [start + i for i in ref]
+    # grouping / interpolation: autograd matches plain indexing
+    feat = torch.randn(xyz.shape[0], 8, requires_grad=True)
+    idx, _ = pointops.knn_query(nsample, xyz, offset, new_xyz, new_offset)
+    grad = torch.autograd.grad(pointops.grouping2(feat, idx).square().sum(), feat)
+    ref = torch.autograd.grad(feat[idx.long()].square().sum(), feat)
+    assert torch.allclose(grad[0], ref[0], atol=1e-5)
+    output = pointops.interpolation2(xyz, new_xyz, feat, offset, new_offset)
+    ref = pointops.interpolation(xyz, new_xyz, feat, offset, new_offset)
+    assert torch.allclose(output, ref, atol=1e-5)
+    # empty batch, and an empty sample between two others
+    empty, none = torch.zeros(0, 3), torch.zeros(0, dtype=torch.int32)
+    assert pointops.farthest_point_sampling(empty, none, none).numel() == 0
+    assert pointops.knn_query(nsample, empty, none)[0].shape == (0, nsample)
+    xyz = torch.rand(150, 3)
+    offset = torch.tensor([100, 100, 150], dtype=torch.int32)
+    new_offset = torch.tensor([25, 25, 37], dtype=torch.int32)
+    idx = pointops.farthest_point_sampling(xyz, offset, new_offset)
+    for (start, end), (new_start, new_end) in zip(ranges(offset), ranges(new_offset)):
+        ref = pointops.farthest_point_sampling(
+            xyz[start:end].contiguous(),
+            torch.tensor([end - start], dtype=torch.int32),
+            torch.tensor([new_end - new_start], dtype=torch.int32),
+        )
+        assert torch.equal(idx[new_start:new_end], ref + start)
+    new_xyz = xyz[idx.long()].contiguous()
+    for query, args in [(pointops.knn_query, ()), (pointops.ball_query, (radius, 0))]:
+        idx, _ = query(nsample, *args, xyz, offset, new_xyz, new_offset)
+        assert idx.shape == (37, nsample)
+        assert (idx[:25] < 100).all()
+        assert ((idx[25:] >= 100) | (idx[25:] == -1)).all()
+
+
+def check_cuda(nsample=16, radius=0.4):
+    xyz, offset, new_xyz, new_offset = generate(3, 2000)
+    cuda = [t.cuda() for t in (xyz, offset, new_xyz, new_offset)]
+    idx, dist = pointops.knn_query(nsample, xyz, offset, new_xyz, new_offset)
+    idx_cuda, dist_cuda = pointops.knn_query(nsample, *cuda)
+    assert torch.allclose(dist, dist_cuda.cpu(), atol=1e-4)
+    assert (idx == idx_cuda.cpu()).float().mean() > 0.999
+    # the CUDA kernel does not fully sort the candidates, compare the rows with
+    # at most nsample candidates (all of them returned) as sets
+    idx, _ = pointops.ball_query(nsample, radius, 0, xyz, offset, new_xyz, new_offset)
+    idx_cuda, _ = pointops.ball_query(nsample, radius, 0, *cuda)
+    rows = (idx < 0).any(1)
+    assert torch.equal(idx[rows].sort(1)[0], idx_cuda.cpu()[rows].sort(1)[0])
+    idx = pointops.farthest_point_sampling(xyz, offset, new_offset)
+    idx_cuda = pointops.farthest_point_sampling(cuda[0], cuda[1], cuda[3])
+    assert (idx == idx_cuda.cpu()).float().mean() > 0.99
+    feat = torch.randn(xyz.shape[0], 8)
+    idx, _ = pointops.knn_query(nsample, xyz, offset, new_xyz, new_offset)
+    assert torch.allclose(
+        pointops.grouping2(feat, idx),
+        pointops.grouping2(feat.cuda(), idx.cuda()).cpu(),
+    )
+    assert torch.allclose(
+        pointops.interpolation2(xyz, new_xyz, feat, offset, new_offset),
+        pointops.interpolation2(cuda[0], cuda[2], feat.cuda(), cuda[1], cuda[3]).cpu(),
+        atol=1e-5,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num-points", default=50000, type=int)
+    parser.add_argument("--batch-size", default=4, type=int)
+    parser.add_argument("--nsample", default=16, type=int)
+    parser.add_argument("--radius", default=0.2, type=float)
+    parser.add_argument("--repeat", default=3, type=int)
+    args = parser.parse_args()
+
+    check_cpu()
+    devices = [torch.device("cpu")]
+    if torch.cuda.is_available():
+        check_cuda()
+        devices.append(torch.device("cuda"))
+    print("parity checks passed")
+
+    data = generate(args.batch_size, args.num_points)
+    print(f"batch size {args.batch_size}, ~{args.num_points} points per sample")
+    for device in devices:
+        xyz, offset, new_xyz, new_offset = (t.to(device) for t in data)
+        feat = torch.randn(xyz.shape[0], 64, device=device)
+        idx, _ = pointops.knn_query(args.nsample, xyz, offset, new_xyz, new_offset)
+        for name, func in [
+            (
+                "knn_query",
+                lambda: pointops.knn_query(
+                    args.nsample, xyz, offset, new_xyz, new_offset
+                ),
+            ),
+            (
+                "ball_query",
+                lambda: pointops.ball_query(
+                    args.nsample, args.radius, 0, xyz, offset, new_xyz, new_offset
+                ),
+            ),
+            (
+                "farthest_point_sampling",
+                lambda: pointops.farthest_point_sampling(xyz, offset, new_offset),
+            ),
+            ("grouping", lambda: pointops.grouping2(feat, idx)),
+            (
+                "interpolation",
+                lambda: pointops.interpolation2(
+                    new_xyz,
+                    xyz,
+                    feat[: new_xyz.shape[0]].contiguous(),
+                    new_offset,
+                    offset,
+                ),
+            ),
+        ]:
+            elapsed = timeit(func, args.repeat, device)
+            print(f"[{device.type}] {name}: {elapsed * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()